@@ -0,0 +1,162 @@
+"""
+Versioned JSON API for taking exams from SPA and mobile clients.
+
+    GET  /api/v1/exams/<id>/paper/     questions and choices (no answers), with an ETag
+    GET  /api/v1/exams/<id>/progress/  where the student is in the exam
+    POST /api/v1/exams/<id>/answers/   {"answers": [[question_id, choice_id], ...]}
+    POST /api/v1/exams/<id>/finalize/  score the completed exam
+
+Answers are given in order starting at the current question (progress.next),
+one at a time or a whole section at once, and follow the same level-unlock
+rules as take_exam. The paper is served from the cached exam paper and its
+ETag is the paper version, so unchanged papers cost one small query and a 304.
+Requests use the session login; POSTs need the CSRF token (X-CSRFToken header).
+"""
+import json
+from functools import wraps
+
+from django.http import JsonResponse
+from django.shortcuts import get_object_or_404
+from django.views.decorators.cache import cache_control
+from django.views.decorators.http import etag, require_GET, require_POST
+
+from .attempts import advance, finalize_attempt, is_complete, questions_for, unavailable_reason
+from .grading import key_for_paper
+from .models import Exam, ExamSession, StudentExamAttempt
+from .paper import get_paper
+
+
+def student_api(view):
+    """Like login_required for students, but answering with JSON errors instead of redirects."""
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        if not request.user.is_authenticated:
+            return JsonResponse({'error': 'Authentication required'}, status=401)
+        if not request.user.is_student:
+            return JsonResponse({'error': 'Unauthorized'}, status=403)
+        return view(request, *args, **kwargs)
+    return wrapper
+
+
+def paper_etag(request, exam_id):
+    version = Exam.objects.filter(id=exam_id).values_list('paper_version', flat=True).first()
+    return f"{exam_id}-{version}" if version is not None else None
+
+
+def progress_payload(state, paper):
+    allowed = questions_for(paper, state.allowed_levels)
+    return {
+        'position': state.position,
+        'levels': state.allowed_levels,
+        'unlocked': len(allowed),
+        'next': allowed[state.position].id if state.position < len(allowed) else None,
+        'complete': state.position >= len(allowed),
+    }
+
+
+def attempt_payload(attempt):
+    return {
+        'score': attempt.score,
+        'eligibility': attempt.eligibility,
+        'levels': {
+            'easy': [attempt.easy_score, attempt.easy_total],
+            'medium': [attempt.medium_score, attempt.medium_total],
+            'hard': [attempt.hard_score, attempt.hard_total],
+        },
+    }
+
+
+def open_session(request, exam_id):
+    """
+    Return (exam, paper, ExamSession), or a JsonResponse when the exam is
+    already completed or not ready to be taken.
+    """
+    exam = get_object_or_404(Exam, id=exam_id)
+    attempt = StudentExamAttempt.objects.filter(student=request.user, exam=exam, score__isnull=False).first()
+    if attempt:
+        return JsonResponse({'error': 'Exam already completed', 'result': attempt_payload(attempt)}, status=409)
+    exam_paper = get_paper(exam)
+    reason = unavailable_reason(exam, exam_paper)
+    if reason:
+        return JsonResponse({'error': reason}, status=409)
+    state, _ = ExamSession.objects.get_or_create(student=request.user, exam=exam)
+    return exam, exam_paper, state
+
+
+@require_GET
+@student_api
+@cache_control(private=True, no_cache=True)  # clients keep the paper and revalidate it with the ETag
+@etag(paper_etag)
+def paper(request, exam_id):
+    exam = get_object_or_404(Exam, id=exam_id)
+    exam_paper = get_paper(exam)
+    # Compact rows: [question_id, text, [[choice_id, text], ...]]
+    return JsonResponse({
+        'exam': exam.id,
+        'title': exam.title,
+        'version': exam_paper.version,
+        'levels': {
+            level: [[q.id, q.text, [[c.id, c.text] for c in q.choices]] for q in questions]
+            for level, questions in exam_paper.levels.items()
+        },
+    })
+
+
+@require_GET
+@student_api
+def progress(request, exam_id):
+    opened = open_session(request, exam_id)
+    if isinstance(opened, JsonResponse):
+        return opened
+    _, exam_paper, state = opened
+    return JsonResponse(progress_payload(state, exam_paper))
+
+
+@require_POST
+@student_api
+def answers(request, exam_id):
+    opened = open_session(request, exam_id)
+    if isinstance(opened, JsonResponse):
+        return opened
+    _, exam_paper, state = opened
+
+    try:
+        pairs = [(int(question_id), int(choice_id)) for question_id, choice_id in json.loads(request.body)['answers']]
+    except (ValueError, TypeError, KeyError):
+        return JsonResponse({'error': 'Expected {"answers": [[question_id, choice_id], ...]}'}, status=400)
+    if not pairs:
+        return JsonResponse({'error': 'No answers given'}, status=400)
+
+    # Answers must continue from the current question, within the unlocked levels
+    allowed = questions_for(exam_paper, state.allowed_levels)
+    expected = allowed[state.position:state.position + len(pairs)]
+    if [question.id for question in expected] != [question_id for question_id, _ in pairs]:
+        return JsonResponse({'error': 'Answers must start at the next question', **progress_payload(state, exam_paper)},
+                            status=409)
+
+    key = key_for_paper(exam_paper)
+    graded = []
+    for question, (_, choice_id) in zip(expected, pairs):
+        if choice_id not in {choice.id for choice in question.choices}:
+            return JsonResponse({'error': f'Invalid choice for question {question.id}'}, status=400)
+        graded.append((choice_id, *key.grade_answer(question.id, choice_id)))
+
+    if not state.record_answers(graded):
+        state.refresh_from_db()
+        return JsonResponse({'error': 'Answers already recorded', **progress_payload(state, exam_paper)}, status=409)
+    advance(state, exam_paper, finalize=False)
+    return JsonResponse(progress_payload(state, exam_paper))
+
+
+@require_POST
+@student_api
+def finalize(request, exam_id):
+    opened = open_session(request, exam_id)
+    if isinstance(opened, JsonResponse):
+        return opened
+    _, exam_paper, state = opened
+
+    if not is_complete(state, exam_paper):
+        return JsonResponse({'error': 'Exam has unanswered questions', **progress_payload(state, exam_paper)},
+                            status=409)
+    return JsonResponse(attempt_payload(finalize_attempt(state, exam_paper)))
@@ -0,0 +1,9 @@
+from django.urls import path
+from . import api
+
+urlpatterns = [
+    path('exams/<int:exam_id>/paper/', api.paper, name='api_exam_paper'),
+    path('exams/<int:exam_id>/progress/', api.progress, name='api_exam_progress'),
+    path('exams/<int:exam_id>/answers/', api.answers, name='api_exam_answers'),
+    path('exams/<int:exam_id>/finalize/', api.finalize, name='api_exam_finalize'),
+]
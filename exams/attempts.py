@@ -0,0 +1,172 @@
+"""
+Finalization of exam attempts.
+
+When a student finishes, the answers packed in their ExamSession become
+StudentResponse rows and a scored StudentExamAttempt. finalize_attempt checks
+every submitted id with one in_bulk query per model (instead of two lookups
+per answer) and writes everything in one transaction, so finishing an exam
+costs the same handful of queries whatever its length.
+
+Students answer either one question at a time or, in section mode, every
+remaining question of the current level in one submission (submit_section).
+Both paths record answers on the ExamSession and then call advance(), which
+applies the same level-unlock rules.
+"""
+from django.db import transaction
+from django.utils import timezone
+
+from .grading import key_for_paper
+from .models import AnswerChoice, ExamSession, GenerationJob, Question, StudentExamAttempt, StudentResponse
+
+
+def unlocked_levels(level_correct, level_total):
+    """Levels open to a student: medium needs half of easy right, hard half of medium."""
+    levels = ['easy']
+    if level_total['easy'] > 0 and (level_correct['easy'] / level_total['easy']) >= 0.5:
+        levels.append('medium')
+    if level_total['medium'] > 0 and (level_correct['medium'] / level_total['medium']) >= 0.5:
+        levels.append('hard')
+    return levels
+
+
+def eligibility_for(levels):
+    if 'medium' not in levels:
+        return 'Needs Improvement'
+    if 'hard' not in levels:
+        return 'Average'
+    return 'Excellent'
+
+
+def unavailable_reason(exam, paper):
+    """
+    Why `exam` can't be taken yet, or None. Exams are listed as soon as they
+    are created, while their questions may still be queued for generation
+    (see exams/jobs.py); starting one then would score an empty paper.
+    """
+    if GenerationJob.objects.filter(exam=exam, status__in=(GenerationJob.QUEUED, GenerationJob.RUNNING)).exists():
+        return "Questions for this exam are still being generated. Please try again in a few minutes."
+    if not paper.questions:
+        return "This exam has no questions yet."
+    return None
+
+
+def questions_for(paper, levels):
+    """The paper's questions of `levels`, in the order they are asked."""
+    return [question for level in levels for question in paper.levels[level]]
+
+
+def current_section(state, paper):
+    """The unanswered questions of the level the student is currently in."""
+    pending = questions_for(paper, state.allowed_levels)[state.position:]
+    if not pending:
+        return []
+    level = pending[0].difficulty.lower()
+    return [question for question in pending if question.difficulty.lower() == level]
+
+
+def submit_section(state, paper, answers):
+    """
+    Grade and record a whole section in one pass. `answers` maps question ids
+    to selected choice ids and must cover every question of current_section().
+    Raises ValueError for missing or invalid answers; returns False when the
+    section was already submitted.
+    """
+    section = current_section(state, paper)
+    if not section:
+        raise ValueError("There are no questions left to answer.")
+    if answers and not any(question.id in answers for question in section):
+        return False  # a resubmitted form for a section that is already recorded
+
+    key = key_for_paper(paper)
+    graded = []
+    for question in section:
+        try:
+            choice_id = int(answers[question.id])
+        except (KeyError, TypeError, ValueError):
+            raise ValueError("Please answer every question before submitting.")
+        if choice_id not in {choice.id for choice in question.choices}:
+            raise ValueError("Invalid question or choice.")
+        graded.append((choice_id, *key.grade_answer(question.id, choice_id)))
+    return state.record_answers(graded)
+
+
+def advance(state, paper, finalize=True):
+    """
+    Call after recording answers. Once every unlocked question is answered,
+    either unlock the next level or (unless finalize=False) finalize the
+    attempt. Returns the StudentExamAttempt when the exam is finished,
+    otherwise None.
+    """
+    allowed = questions_for(paper, state.allowed_levels)
+    if state.position < len(allowed) or not paper.questions:
+        return None  # an empty paper is never finished
+
+    levels = unlocked_levels(*state.level_counts())
+    if len(questions_for(paper, levels)) > len(allowed):
+        # Unlock the next level; position already points at its first question
+        ExamSession.objects.filter(pk=state.pk).update(unlocked_levels=len(levels))
+        state.unlocked_levels = len(levels)
+        return None
+    return finalize_attempt(state, paper) if finalize else None
+
+
+def is_complete(state, paper):
+    """True once advance() has nothing left to unlock and every unlocked question is answered."""
+    return bool(paper.questions) and state.position >= len(questions_for(paper, state.allowed_levels))
+
+
+def finalize_attempt(state, paper):
+    """
+    Record the answers of `state` (an ExamSession) as the student's responses
+    and scored attempt, then delete the session. Answers are matched to
+    questions through `paper`; ids that no longer exist are skipped.
+    Returns the StudentExamAttempt.
+    """
+    question_for_choice = {choice.id: question.id for question in paper.questions.values() for choice in question.choices}
+    answers = [
+        (question_for_choice[choice_id], choice_id)
+        for choice_id in state.selected_choice_ids() if choice_id in question_for_choice
+    ]
+
+    # One query per model confirms the paper's ids are still in the database
+    question_ids = Question.objects.filter(exam_id=state.exam_id).only('id').in_bulk(
+        [question_id for question_id, _ in answers], field_name='id').keys()
+    choice_ids = AnswerChoice.objects.filter(question__exam_id=state.exam_id).only('id').in_bulk(
+        [choice_id for _, choice_id in answers], field_name='id').keys()
+
+    level_correct, level_total = state.level_counts()
+    total_possible = sum(level_total.values())
+    score_percent = (sum(level_correct.values()) / total_possible) * 100 if total_possible > 0 else 0
+
+    recorded = [
+        (question_id, choice_id) for question_id, choice_id in answers
+        if question_id in question_ids and choice_id in choice_ids
+    ]
+    # Per-topic breakdown, stored on the attempt so reports don't re-aggregate responses
+    topic_stats = key_for_paper(paper).grade(recorded).topics
+
+    with transaction.atomic():
+        StudentResponse.objects.filter(student_id=state.student_id, exam_id=state.exam_id).delete()
+        StudentResponse.objects.bulk_create([
+            StudentResponse(student_id=state.student_id, exam_id=state.exam_id,
+                            question_id=question_id, selected_choice_id=choice_id)
+            for question_id, choice_id in recorded
+        ])
+        attempt, _ = StudentExamAttempt.objects.update_or_create(
+            student_id=state.student_id,
+            exam_id=state.exam_id,
+            defaults={
+                'score': score_percent,
+                'end_time': timezone.now(),
+                'easy_score': level_correct['easy'],
+                'easy_total': level_total['easy'],
+                'medium_score': level_correct['medium'],
+                'medium_total': level_total['medium'],
+                'hard_score': level_correct['hard'],
+                'hard_total': level_total['hard'],
+                'eligibility': eligibility_for(unlocked_levels(level_correct, level_total)),
+                'topic_stats': topic_stats,
+            }
+        )
+        ExamSession.objects.filter(pk=state.pk).delete()
+    return attempt
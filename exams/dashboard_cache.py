@@ -0,0 +1,46 @@
+"""
+Cached student dashboard fragments.
+
+The exam list a student sees depends only on the exam catalog and on which
+exams the student has completed, so the rendered fragment is cached per
+student and page. Keys embed two versions read from the database on each
+request: the catalog's (newest exam id and exam count, which change when
+exams are created or deleted) and the student's (latest completed attempt
+and attempt count, which change when an attempt is recorded or removed).
+Because they come from the database rather than from counters in the cache,
+every worker process sees the same versions even with a per-process cache,
+and a change retires the old fragments without having to find them.
+"""
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, Max
+
+from .models import Exam, StudentExamAttempt
+
+
+def catalog_version():
+    catalog = Exam.objects.aggregate(last=Max('id'), count=Count('id'))
+    return f"{catalog['last'] or 0}.{catalog['count']}"
+
+
+def student_version(student_id):
+    attempts = StudentExamAttempt.objects.filter(student_id=student_id, score__isnull=False).aggregate(
+        last=Max('end_time'), count=Count('id'))
+    last = attempts['last'].timestamp() if attempts['last'] else 0
+    return f"{last}.{attempts['count']}"
+
+
+def fragment_key(student_id, after):
+    # Only a page cursor (a primary key) goes into the key; anything else is the first page
+    after = int(after) if str(after).isdigit() else 0
+    return f'student_dashboard:{student_id}:{after}:{catalog_version()}:{student_version(student_id)}'
+
+
+def get_fragment(student_id, after, render):
+    """Return the cached fragment for this student and page, or `render()` and cache it."""
+    key = fragment_key(student_id, after)
+    fragment = cache.get(key)
+    if fragment is None:
+        fragment = render()
+        cache.set(key, fragment, timeout=getattr(settings, 'STUDENT_DASHBOARD_CACHE_TIMEOUT', 300))
+    return fragment
@@ -0,0 +1,148 @@
+"""
+Near-duplicate detection for generated questions.
+
+Exact text matching lets reworded questions through ("Which of these best
+describes X?" vs "What best describes X in Python?"). Each question is
+reduced to a set of features: the stemmed content words (in any script) of
+its text, those of its correct answer, and the correct answer as a whole,
+counted ANSWER_WEIGHT times. Questions that share most of their wording but
+not their answer ("binary search" / O(log n) vs "linear search" / O(n))
+are thus kept apart, while rewordings with the same answer are pulled
+together. Two questions are duplicates when the Jaccard similarity of their
+feature sets reaches EXAM_DUPLICATE_THRESHOLD. A question without any words
+(only symbols, say) can only be compared by its exact text.
+
+Comparing a new question against every earlier one would cost O(n) per
+question, so the index keeps MinHash signatures split into LSH bands: only
+questions sharing a band bucket are compared, which keeps lookups roughly
+constant-time however many questions (of this exam and of earlier exams
+built from the same source) are indexed.
+"""
+import hashlib
+import random
+import re
+from collections import defaultdict
+
+from django.conf import settings
+
+from .retrieval import STOP_WORDS
+
+MERSENNE_PRIME = (1 << 61) - 1
+
+# Unicode-aware, so questions generated from non-English text have features too
+WORD_RE = re.compile(r"\w+")
+
+# How many features the correct answer as a whole is worth
+ANSWER_WEIGHT = 3
+
+# Question boilerplate that says nothing about what is asked
+QUESTION_WORDS = frozenset("""
+which what following best describes describe correct true statement does used using
+""".split())
+
+
+def stem(token):
+    for suffix in ('ing', 'es', 's', 'ed'):
+        if len(token) > 4 and token.endswith(suffix):
+            return token[:-len(suffix)]
+    return token
+
+
+def tokenize(text):
+    return [token for token in WORD_RE.findall(text.lower()) if token not in STOP_WORDS]
+
+
+def features(text, answer=''):
+    """
+    Stemmed content words of a question, plus those of its correct answer
+    (marked with '=') and ANSWER_WEIGHT copies of the whole answer (marked
+    '=='). Empty when the question itself has no words.
+    """
+    words = {stem(token) for token in tokenize(text) if token not in QUESTION_WORDS}
+    if not words:
+        return set()
+    answer_words = tokenize(answer)
+    words |= {'=' + stem(token) for token in answer_words}
+    if answer_words:
+        whole_answer = ' '.join(answer_words)
+        words |= {f'=={copy}:{whole_answer}' for copy in range(ANSWER_WEIGHT)}
+    return words
+
+
+def correct_answer(q_data):
+    """Text of the correct choice of a parsed question dict (see exams/parsing.py)."""
+    return next((choice['text'] for choice in q_data.get('answer_choices', []) if choice['is_correct']), '')
+
+
+def jaccard(a, b):
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
+
+
+def _hash(feature):
+    # Stable across processes, unlike hash() on str
+    return int.from_bytes(hashlib.blake2b(feature.encode(), digest_size=8).digest(), 'big')
+
+
+class NearDuplicateIndex:
+    """
+    MinHash/LSH index of questions. With the default 32 bands of 4 rows,
+    pairs above roughly 0.42 similarity become candidates (a 0.6 pair is
+    missed about 1% of the time); candidates are then compared by their exact
+    Jaccard similarity against `threshold`.
+    """
+
+    def __init__(self, threshold=None, bands=32, rows=4, seed=1):
+        if threshold is None:
+            threshold = getattr(settings, 'EXAM_DUPLICATE_THRESHOLD', 0.6)
+        self.threshold = threshold
+        self.bands = bands
+        self.rows = rows
+        rng = random.Random(seed)
+        self.permutations = [
+            (rng.randrange(1, MERSENNE_PRIME), rng.randrange(0, MERSENNE_PRIME))
+            for _ in range(bands * rows)
+        ]
+        self.buckets = defaultdict(list)  # (band, band signature) -> [entry ids]
+        self.entries = []  # entry id -> feature set
+        self.wordless = set()  # normalized text of questions without any features
+
+    def __len__(self):
+        return len(self.entries) + len(self.wordless)
+
+    def band_keys(self, feature_set):
+        hashes = [_hash(feature) for feature in feature_set]
+        signature = [min((a * h + b) % MERSENNE_PRIME for h in hashes) for a, b in self.permutations]
+        rows = self.rows
+        return [(band, tuple(signature[band * rows:(band + 1) * rows])) for band in range(self.bands)]
+
+    def add(self, text, answer='', check=True):
+        """
+        Index a question and return True, or return False without indexing it
+        when `check` is set and it is a near-duplicate of an indexed question.
+        """
+        feature_set = features(text, answer)
+        if not feature_set:
+            # Nothing to measure similarity on, so only an identical question is a duplicate
+            normalized = (' '.join(text.lower().split()), ' '.join(answer.lower().split()))
+            if check and normalized in self.wordless:
+                return False
+            self.wordless.add(normalized)
+            return True
+        keys = self.band_keys(feature_set)
+
+        if check:
+            compared = set()
+            for key in keys:
+                for entry in self.buckets.get(key, ()):
+                    if entry not in compared:
+                        compared.add(entry)
+                        if jaccard(feature_set, self.entries[entry]) >= self.threshold:
+                            return False
+
+        entry = len(self.entries)
+        self.entries.append(feature_set)
+        for key in keys:
+            self.buckets[key].append(entry)
+        return True
@@ -0,0 +1,553 @@
+"""
+Question generation helpers shared by the exam views and the background
+generation workers (see exams/jobs.py). PDF text extraction lives in
+exams/pdf_text.py.
+"""
+import hashlib
+import queue
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import closing
+
+from django.conf import settings
+from django.db.models import Count, Q
+from g4f.client import Client
+from .dedup import NearDuplicateIndex, correct_answer
+from .llm_cache import get_llm_cache
+from .models import AnswerChoice, Question
+from .parsing import QuestionStreamParser
+from .persistence import save_generated_questions
+from .retrieval import ContextSelector
+
+
+client = Client()
+
+# Bump whenever a prompt template below changes so cached completions of the
+# old prompt are no longer reused (see exams/llm_cache.py).
+PROMPT_VERSION = 1
+
+
+def chat_completion(prompt_text, model, web_search=False):
+    """
+    Send a single-message chat completion and return the response text.
+    Failed calls are retried with exponential backoff (plus jitter) up to
+    EXAM_GENERATION_RETRIES times; the last error is re-raised.
+    """
+    retries = getattr(settings, 'EXAM_GENERATION_RETRIES', 2)
+    backoff = getattr(settings, 'EXAM_GENERATION_BACKOFF', 2.0)
+    timeout = getattr(settings, 'EXAM_GENERATION_TIMEOUT', 120)
+
+    for attempt in range(retries + 1):
+        try:
+            response = client.chat.completions.create(
+                model=model,
+                messages=[{"role": "user", "content": prompt_text}],
+                web_search=web_search,
+                timeout=timeout
+            )
+            return response.choices[0].message.content
+        except Exception as e:
+            if attempt == retries:
+                raise
+            delay = backoff * (2 ** attempt) + random.uniform(0, backoff)
+            print(f"GPT call failed ({e}), retrying in {delay:.1f}s")
+            time.sleep(delay)
+
+
+def stream_chat_completion(prompt_text, model, web_search=False):
+    """
+    Streaming variant of chat_completion: yields the response text as it is
+    generated. Calls that fail before producing any text are retried like
+    chat_completion; a failure mid-stream is raised to the caller.
+    """
+    retries = getattr(settings, 'EXAM_GENERATION_RETRIES', 2)
+    backoff = getattr(settings, 'EXAM_GENERATION_BACKOFF', 2.0)
+    timeout = getattr(settings, 'EXAM_GENERATION_TIMEOUT', 120)
+
+    for attempt in range(retries + 1):
+        started = False
+        try:
+            for chunk in client.chat.completions.create(
+                model=model,
+                messages=[{"role": "user", "content": prompt_text}],
+                web_search=web_search,
+                timeout=timeout,
+                stream=True
+            ):
+                delta = chunk.choices[0].delta.content if chunk.choices else None
+                if delta:
+                    started = True
+                    yield delta
+            return
+        except Exception as e:
+            if started or attempt == retries:
+                raise
+            delay = backoff * (2 ** attempt) + random.uniform(0, backoff)
+            print(f"GPT call failed ({e}), retrying in {delay:.1f}s")
+            time.sleep(delay)
+
+
+def stream_questions(model, text, cache_params, prompt_text, num_options, use_cache=True, on_replay=None):
+    """
+    Yield (level, question) pairs parsed from the completion of `prompt_text`
+    as soon as each question is complete. A cached completion is replayed
+    through the same parser (and `on_replay()` is called); a fresh one is
+    streamed from the model and cached once it has finished.
+    """
+    cache = get_llm_cache()
+    parser = QuestionStreamParser(num_options)
+
+    cached = cache.lookup(model, PROMPT_VERSION, text, cache_params, use_cache=use_cache)
+    if cached is not None:
+        if on_replay:
+            on_replay()
+        yield from parser.feed(cached)
+        yield from parser.close()
+        return
+
+    received = []
+    for delta in stream_chat_completion(prompt_text, model=model):
+        received.append(delta)
+        yield from parser.feed(delta)
+    yield from parser.close()
+    cache.store(model, PROMPT_VERSION, text, cache_params, "".join(received), use_cache=use_cache)
+
+def extract_skills_from_text(text, num_skills=10, use_cache=True):
+    """Extract skills using AI-based extraction with GPT."""
+    try:
+        prompt_text = f"""Analyze the following text and identify up to {num_skills} Main topics mentioned in the text.
+Provide ONLY the skills as a comma-separated list, with no additional text or formatting.
+        
+
+        Text:
+        {text}
+
+        Example Output: Sub topic 1, Sub topic 2, Sub topic 3
+        """
+
+        gpt_response = get_llm_cache().get_or_call(
+            "gpt-4o-mini", PROMPT_VERSION, text, {'task': 'skills', 'num_skills': num_skills},
+            lambda: chat_completion(prompt_text, model="gpt-4o-mini", web_search=True),
+            use_cache=use_cache
+        )
+
+        # Split the response by comma and strip whitespace
+        skills = [skill.strip() for skill in gpt_response.split(',') if skill.strip()]
+        return skills[:num_skills] # Return up to num_skills
+
+    except Exception as e:
+        print(f"GPT Sub topic Extraction Error: {e}")
+        
+def generate_questions_with_gpt(text, num_questions=3, num_options=4, topic_prompt="", attempt=0, use_cache=True, on_question=None, on_replay=None):
+    """
+    Generate multiple choice questions about `text`. The raw completion is
+    cached per `attempt`, so a top-up retry asks the model again while
+    regenerating the same exam replays the stored answers.
+    The response is streamed and `on_question(question)` is called for each
+    question as soon as it has been parsed; the full list is also returned.
+    `on_replay()` is called when the completion comes from the cache.
+    """
+    questions_data = []
+    try:
+        # Create the prompt based on whether topic_prompt is provided.
+        if topic_prompt:
+            prompt_text = f"""Generate {num_questions} multiple choice questions from the following text:
+
+{text}
+{topic_prompt}
+**Formatting Requirements:**
+
+1. Ensure each question is unique and does not repeat concepts.
+2. Provide {num_options} distinct answer options per question. 
+3. Mark only ONE correct answer clearly.
+4. Include real-world examples where appropriate for diversity.
+
+For each question, please follow this structure EXACTLY:
+
+1. **Question Text:** Start with the question number (e.g., "Question 1:") followed by the question itself on a single line. Please ensure the question is clear and concise and relevant to the topic '{topic_prompt}'.
+
+2. **Answer Choices:** Provide exactly {num_options} answer choices. Use lowercase letters (a, b, c, etc.) followed by a period and a space (e.g., {" ".join([f'"{chr(97+i)}. Choice text"' for i in range(num_options)])}). Ensure each choice is unique and plausible, but only one is definitively correct.
+
+3. **Correct Answer:** On a new line after the choices, clearly indicate the correct answer by stating "Correct Answer: " followed by the letter corresponding to the correct choice (e.g., "Correct Answer: {"a" if num_options == 2 else "b"}").
+
+**Example of Desired Output Format:**
+
+Question 1: What is the capital of France?
+a. Berlin
+b. Paris
+c. Rome
+d. London
+......(As many options as mentioned ie {num_options})
+Correct Answer: b
+
+Question 2: ...
+"""
+        else:
+            prompt_text = f"""Generate {num_questions} multiple choice questions from the following text:
+
+{text}
+
+**Formatting Requirements:**
+
+For each question, please follow this structure EXACTLY:
+
+1. **Question Text:** Start with the question number (e.g., "Question 1:") followed by the question itself on a single line. Please ensure the question is clear and concise.
+
+2. **Answer Choices:** Provide {num_options} answer choices, each on a new line, labeled with lowercase letters followed by a period (e.g., "a. Choice text", "b. Another choice"). Ensure each choice is a plausible answer but only one should be definitively correct.
+
+3. **Correct Answer:** On a new line after the choices, clearly indicate the correct answer by stating "Correct Answer: " followed by the letter corresponding to the correct choice (e.g., "Correct Answer: b").
+
+**Example of Desired Output Format:**
+
+Question 1: What is the capital of France?
+a. Berlin
+b. Paris
+c. Rome
+d. London
+......(As many options as mentioned ie {num_options})
+Correct Answer: b
+
+Question 2: ...
+"""
+
+        # Stream from the GPT model (or replay a cached completion for the same inputs).
+        questions_data = []
+        cache_params = {'task': 'questions', 'num_questions': num_questions, 'num_options': num_options,
+                        'topic_prompt': topic_prompt, 'attempt': attempt}
+        for _, question in stream_questions("gpt-4o", text, cache_params, prompt_text, num_options,
+                                            use_cache=use_cache, on_replay=on_replay):
+            # Ensure we only return the required number of questions
+            if len(questions_data) < num_questions:
+                questions_data.append(question)
+                if on_question:
+                    on_question(question)
+        return questions_data
+
+    except Exception as e:
+        print(f"GPT Error: {e}")
+        return questions_data
+
+LEVELS = ["Easy", "Medium", "Hard"]
+
+def generate_skill_questions_with_gpt(text, skill, num_questions=3, num_options=4, attempt=0, use_cache=True, on_question=None, on_replay=None):
+    """
+    Batched variant of generate_questions_with_gpt: one request returns
+    `num_questions` questions for each of the Easy, Medium and Hard levels of
+    `skill`. Returns {level: questions}; levels the model skipped or
+    malformed come back short and are topped up through the per-level path.
+    `on_question(level, question)` is called as each question is parsed and
+    `on_replay()` when the completion comes from the cache.
+    """
+    questions_by_level = {level: [] for level in LEVELS}
+    try:
+        prompt_text = f"""Generate multiple choice questions about the topic '{skill}' from the following text:
+
+{text}
+
+Write exactly {num_questions} questions for EACH of the three difficulty levels: Easy, Medium and Hard.
+
+**Formatting Requirements:**
+
+1. Ensure each question is unique and does not repeat concepts.
+2. Provide {num_options} distinct answer options per question.
+3. Mark only ONE correct answer clearly.
+4. Make the levels clearly different: Easy recalls facts, Medium applies them, Hard combines or analyses them.
+
+Start each level with a heading line "Level: Easy", "Level: Medium" or "Level: Hard", followed by that level's questions. For each question, please follow this structure EXACTLY:
+
+1. **Question Text:** Start with the question number (e.g., "Question 1:") followed by the question itself on a single line.
+
+2. **Answer Choices:** Provide exactly {num_options} answer choices. Use lowercase letters (a, b, c, etc.) followed by a period and a space (e.g., {" ".join([f'"{chr(97+i)}. Choice text"' for i in range(num_options)])}).
+
+3. **Correct Answer:** On a new line after the choices, state "Correct Answer: " followed by the letter of the correct choice.
+
+**Example of Desired Output Format:**
+
+Level: Easy
+Question 1: What is the capital of France?
+a. Berlin
+b. Paris
+c. Rome
+d. London
+......(As many options as mentioned ie {num_options})
+Correct Answer: b
+
+Question 2: ...
+
+Level: Medium
+Question 1: ...
+
+Level: Hard
+Question 1: ...
+"""
+
+        cache_params = {'task': 'leveled_questions', 'skill': skill, 'num_questions': num_questions,
+                        'num_options': num_options, 'attempt': attempt}
+        for level, question in stream_questions("gpt-4o", text, cache_params, prompt_text, num_options,
+                                                use_cache=use_cache, on_replay=on_replay):
+            if level in questions_by_level and len(questions_by_level[level]) < num_questions:
+                questions_by_level[level].append(question)
+                if on_question:
+                    on_question(level, question)
+        return questions_by_level
+
+    except Exception as e:
+        print(f"GPT Error: {e}")
+        return questions_by_level
+
+# Rough size of the instructions wrapped around the source text in a prompt
+PROMPT_OVERHEAD_TOKENS = 400
+
+def estimate_tokens(text):
+    """Cheap token estimate (~4 characters per token) used for generation budgets."""
+    return len(text) // 4 + 1
+
+
+class GenerationController:
+    """
+    Tracks how many questions each (skill, level) bucket still needs and how
+    much of its attempt/token budget has been spent. Buckets whose budget runs
+    out are dropped from further rounds instead of being retried forever.
+    """
+
+    def __init__(self, skills, num_questions_per_level, max_attempts=None, token_budget=None):
+        self.target = num_questions_per_level
+        self.max_attempts = max_attempts or getattr(settings, 'EXAM_GENERATION_MAX_ATTEMPTS', 4)
+        self.token_budget = token_budget or getattr(settings, 'EXAM_GENERATION_TOKEN_BUDGET', 60000)
+        buckets = [(skill, level) for skill in skills for level in LEVELS]
+        self.counts = dict.fromkeys(buckets, 0)
+        self.attempts = dict.fromkeys(buckets, 0)
+        self.replays = dict.fromkeys(buckets, 0)
+        self.tokens = dict.fromkeys(buckets, 0)
+
+    def shortfall(self, bucket):
+        return max(self.target - self.counts[bucket], 0)
+
+    def has_budget(self, bucket):
+        return self.attempts[bucket] < self.max_attempts and self.tokens[bucket] < self.token_budget
+
+    def pending(self):
+        """Buckets that still need questions and can afford another attempt."""
+        return [bucket for bucket in self.counts if self.shortfall(bucket) and self.has_budget(bucket)]
+
+    def record_attempt(self, bucket, text, generated_questions, share=1):
+        """Count one LLM call for `bucket`; a batched call's prompt is split across its `share` buckets."""
+        self.attempts[bucket] += 1
+        completion = "".join(
+            q['text'] + "".join(choice['text'] for choice in q.get('answer_choices', []))
+            for q in generated_questions
+        )
+        self.tokens[bucket] += (estimate_tokens(text) + PROMPT_OVERHEAD_TOKENS) // share + estimate_tokens(completion)
+
+    def record_replay(self, bucket):
+        """
+        Count a cached completion that added nothing (e.g. only duplicates):
+        it costs no budget, but the next request asks for a later attempt.
+        """
+        self.replays[bucket] += 1
+
+    def attempt_number(self, bucket):
+        """The `attempt` of the bucket's next request, which keys its cached completion."""
+        return self.attempts[bucket] + self.replays[bucket]
+
+    def record_question(self, bucket):
+        self.counts[bucket] += 1
+
+    def record_existing(self, bucket, count):
+        """Count questions `bucket` already has (e.g. saved by an interrupted run of the same job)."""
+        if bucket in self.counts:
+            self.counts[bucket] += count
+
+    def shortfalls(self):
+        """Missing question counts for buckets that could not be filled, keyed "skill - level"."""
+        return {f"{skill} - {level}": self.shortfall((skill, level))
+                for skill, level in self.counts if self.shortfall((skill, level))}
+
+    @property
+    def questions_created(self):
+        return sum(self.counts.values())
+
+
+def _generate_request(skill, levels, text, num_questions, num_options, attempt, on_question, use_cache=True, on_replay=None):
+    if len(levels) == 1:
+        return {levels[0]: generate_questions_with_gpt(
+            text=text,
+            num_questions=num_questions,
+            num_options=num_options,
+            topic_prompt=f"{skill} - {levels[0]}",
+            attempt=attempt,
+            use_cache=use_cache,
+            on_question=lambda question: on_question(levels[0], question),
+            on_replay=on_replay
+        )}
+    return generate_skill_questions_with_gpt(text, skill, num_questions, num_options, attempt=attempt,
+                                             use_cache=use_cache, on_question=on_question, on_replay=on_replay)
+
+def generate_many(requests, num_options, max_in_flight=None, use_cache=True):
+    """
+    Run every (skill, levels, text, num_questions, attempt) request
+    concurrently, with at most `max_in_flight` requests outstanding at a time.
+    A request for one level uses generate_questions_with_gpt; a request for
+    several levels is batched into a single generate_skill_questions_with_gpt call.
+
+    Responses are streamed, so this yields lists of events as they arrive:
+    ('question', skill, level, question) for every parsed question and
+    ('done', skill, {level: questions}, replayed) once a request has finished,
+    where `replayed` tells whether its completion came from the cache. Each list
+    holds everything that arrived since the previous one, which lets the
+    caller save questions in batches while the model is still writing.
+    Closing the generator cancels the requests that have not started yet.
+    """
+    max_in_flight = max_in_flight or getattr(settings, 'EXAM_GENERATION_MAX_IN_FLIGHT', 6)
+    events = queue.Queue()
+
+    def run(skill, levels, text, num_questions, attempt):
+        questions_by_level = {}
+        replayed = []
+        try:
+            questions_by_level = _generate_request(
+                skill, levels, text, num_questions, num_options, attempt,
+                on_question=lambda level, question: events.put(('question', skill, level, question)),
+                use_cache=use_cache,
+                on_replay=lambda: replayed.append(True)
+            )
+        finally:
+            events.put(('done', skill, questions_by_level, bool(replayed)))
+
+    executor = ThreadPoolExecutor(max_workers=max_in_flight)
+    try:
+        for request in requests:
+            executor.submit(run, *request)
+
+        remaining = len(requests)
+        while remaining:
+            batch = [events.get()]
+            while True:
+                try:
+                    batch.append(events.get_nowait())
+                except queue.Empty:
+                    break
+            remaining -= sum(1 for event in batch if event[0] == 'done')
+            yield batch
+    finally:
+        # If the caller stopped early (the generator was closed, or saving raised),
+        # drop the requests that have not started rather than spend calls on them
+        executor.shutdown(wait=False, cancel_futures=True)
+
+def plan_requests(controller, contexts, batch_levels):
+    """
+    Turn the controller's pending buckets into generation requests. A skill
+    whose three levels have not been tried yet is asked for all of them in one
+    batched call; everything else (including top-ups after a batched call
+    came back short) falls back to one request per level.
+    """
+    pending_levels = {}
+    for skill, level in controller.pending():
+        pending_levels.setdefault(skill, []).append(level)
+
+    requests = []
+    for skill, levels in pending_levels.items():
+        buckets = [(skill, level) for level in levels]
+        if batch_levels and len(levels) == len(LEVELS) and not any(controller.attempt_number(b) for b in buckets):
+            requests.append((skill, tuple(levels), contexts[skill], controller.target, 0))
+            continue
+        for bucket in buckets:
+            requests.append((skill, (bucket[1],), contexts[skill], controller.shortfall(bucket), controller.attempt_number(bucket)))
+    return requests
+
+def duplicate_index_for(exam, text):
+    """
+    Record the hash of `text` on the exam and return a NearDuplicateIndex of
+    the questions the exam already has and of those of every other exam
+    generated from the same text (e.g. the same PDF uploaded again).
+    """
+    digest = hashlib.sha256(text.encode()).hexdigest()
+    if exam.source_sha256 != digest:
+        exam.source_sha256 = digest
+        exam.save(update_fields=['source_sha256'])
+
+    questions = Question.objects.filter(Q(exam=exam) | Q(exam__source_sha256=digest))
+    answers = dict(AnswerChoice.objects.filter(question__in=questions, is_correct=True).values_list('question_id', 'text'))
+    index = NearDuplicateIndex()
+    for question_id, question_text in questions.values_list('id', 'text').iterator():
+        index.add(question_text, answers.get(question_id, ''), check=False)
+    return index
+
+def generate_exam_questions(exam, text, skills, num_questions_per_level=3, num_options=4, progress=None, max_attempts=None, batch_levels=None):
+    """
+    Generate and save questions for every skill and level of an exam.
+    All skill/level prompts are sent at once (bounded by
+    EXAM_GENERATION_MAX_IN_FLIGHT), so the wall-clock time follows the slowest
+    prompt rather than the sum of all of them. Responses are streamed and their
+    questions bulk-saved on the calling thread while the model is still writing. Follow-up rounds only ask for each bucket's
+    shortfall, and stop once the bucket's attempt or token budget is spent.
+    Long texts are not sent whole: each skill's prompts only carry the chunks
+    retrieved for that skill (see exams/retrieval.py). With `batch_levels`
+    (EXAM_GENERATION_BATCH_LEVELS by default) the first round asks for all
+    three levels of a skill in one call.
+    `progress` is called with the running question count after each saved
+    batch so callers (e.g. the generation worker) can report progress.
+    Questions that are near-duplicates (see exams/dedup.py) of one already
+    accepted, of the exam's existing questions or of questions of earlier
+    exams generated from the same text are dropped and regenerated. When the
+    index starts out non-empty, cached completions are not replayed: they
+    would repeat the very questions already indexed.
+    Returns the GenerationController; its shortfalls() are empty when the exam is complete.
+    """
+    duplicates = duplicate_index_for(exam, text)
+    controller = GenerationController(skills, num_questions_per_level, max_attempts=max_attempts)
+    # A re-run (e.g. a requeued job) only tops up the buckets the exam hasn't filled yet
+    existing = exam.questions.values_list('topic', 'difficulty').annotate(count=Count('id')).order_by()
+    for skill, level, count in existing:
+        controller.record_existing((skill, level), count)
+    selector = ContextSelector(text)
+    contexts = {skill: selector.context_for(skill) for skill in skills}
+
+    if batch_levels is None:
+        batch_levels = getattr(settings, 'EXAM_GENERATION_BATCH_LEVELS', True)
+
+    use_cache = not len(duplicates)
+
+    # Keep generating until every bucket is full or out of budget
+    requests = plan_requests(controller, contexts, batch_levels)
+    while requests:
+        # Each bucket has at most one request per round, so this counts that request's new questions
+        accepted_by_bucket = dict.fromkeys(controller.counts, 0)
+        # If saving or progress raises (e.g. the job was lost), closing the stream cancels the requests not yet sent
+        with closing(generate_many(requests, num_options, use_cache=use_cache)) as stream:
+            for events in stream:
+                accepted = []
+                for event in events:
+                    if event[0] == 'done':
+                        _, skill, questions_by_level, replayed = event
+                        for level, generated_questions in questions_by_level.items():
+                            bucket = (skill, level)
+                            if replayed and not accepted_by_bucket[bucket]:
+                                # A cached completion that added nothing doesn't use up the budget
+                                controller.record_replay(bucket)
+                            else:
+                                controller.record_attempt(bucket, contexts[skill], generated_questions,
+                                                          share=len(questions_by_level))
+                        continue
+
+                    _, skill, level, q_data = event
+                    bucket = (skill, level)
+                    if not controller.shortfall(bucket):
+                        continue
+
+                    # Ensure question uniqueness across all skills, levels and exams of the same source
+                    if duplicates.add(q_data['text'], correct_answer(q_data)):
+                        accepted.append((skill, level, q_data))
+                        controller.record_question(bucket)
+                        accepted_by_bucket[bucket] += 1
+
+                # Save the questions that arrived together (and their choices) in one transaction
+                save_generated_questions(exam, accepted)
+
+                if progress:
+                    progress(controller.questions_created)
+
+        requests = plan_requests(controller, contexts, batch_levels)
+
+    return controller
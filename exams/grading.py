@@ -0,0 +1,81 @@
+"""
+Grading against precomputed answer keys.
+
+An AnswerKey is a compact view of an exam paper: question id -> correct
+choice id, level and topic, in plain dicts. grade() tallies a list of
+(question_id, choice_id) answers in one pass of dict lookups, without
+touching Question or AnswerChoice rows, and returns per-level and per-topic
+marks. take_exam, the JSON API and the teacher reports all grade with it.
+"""
+from collections import namedtuple
+
+from django.conf import settings
+
+from .paper import get_paper
+
+GradeReport = namedtuple('GradeReport', 'marks total levels topics')  # levels/topics hold tallies (see empty_tally)
+
+
+def empty_tally():
+    return {'easy_marks': 0, 'easy_total': 0, 'medium_marks': 0, 'medium_total': 0, 'hard_marks': 0, 'hard_total': 0}
+
+
+class AnswerKey(namedtuple('AnswerKey', 'correct levels topics')):
+    """question id -> correct choice id / lowercase level / topic."""
+
+    @classmethod
+    def from_paper(cls, paper):
+        questions = paper.questions.values()
+        return cls(
+            {question.id: question.correct_choice_id for question in questions},
+            {question.id: question.difficulty.lower() for question in questions},
+            {question.id: question.topic for question in questions},
+        )
+
+    def grade_answer(self, question_id, choice_id):
+        """Return (level, is_correct) for one answer."""
+        return self.levels[question_id], choice_id is not None and self.correct[question_id] == choice_id
+
+    def grade(self, answers):
+        """
+        Grade [(question_id, choice_id), ...]. Questions missing from the key
+        are skipped; a None choice (deleted or unanswered) counts as wrong.
+        """
+        correct, levels, topics = self.correct, self.levels, self.topics
+        overall = empty_tally()
+        by_topic = {}
+        marks = total = 0
+        for question_id, choice_id in answers:
+            level = levels.get(question_id)
+            if level is None:
+                continue
+            topic_tally = by_topic.get(topics[question_id])
+            if topic_tally is None:
+                topic_tally = by_topic[topics[question_id]] = empty_tally()
+            total += 1
+            overall[f"{level}_total"] += 1
+            topic_tally[f"{level}_total"] += 1
+            if choice_id is not None and correct[question_id] == choice_id:
+                marks += 1
+                overall[f"{level}_marks"] += 1
+                topic_tally[f"{level}_marks"] += 1
+        return GradeReport(marks, total, overall, by_topic)
+
+
+_answer_keys = {}
+
+
+def key_for_paper(paper):
+    """The AnswerKey of `paper`, built once per paper version."""
+    cache_key = (paper.exam_id, paper.version)
+    key = _answer_keys.get(cache_key)
+    if key is None:
+        if len(_answer_keys) >= getattr(settings, 'EXAM_PAPER_CACHE_SIZE', 128):
+            _answer_keys.clear()
+        key = _answer_keys[cache_key] = AnswerKey.from_paper(paper)
+    return key
+
+
+def answer_key(exam):
+    """The answer key of the exam's current (cached) paper."""
+    return key_for_paper(get_paper(exam))
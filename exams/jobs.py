@@ -0,0 +1,153 @@
+"""
+Database-backed queue for exam question generation.
+
+The teacher dashboard only enqueues a GenerationJob; the actual LLM calls run in
+worker threads started by `python manage.py run_generation_workers`. Jobs are
+claimed with a conditional UPDATE, so any number of workers on any node that
+shares the database can poll the same queue without taking a job twice.
+"""
+import os
+import socket
+import threading
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import close_old_connections, connection
+from django.utils import timezone
+
+from .generation import generate_exam_questions
+from .llm_cache import get_llm_cache
+from .models import GenerationJob
+from .pdf_text import get_pdf_text
+
+
+def enqueue_generation(exam, teacher, skills, num_options, num_questions_per_level, topic_prompt=''):
+    """Queue question generation for `exam` and return the new job."""
+    return GenerationJob.objects.create(
+        exam=exam,
+        teacher=teacher,
+        params={
+            'skills': skills,
+            'num_options': num_options,
+            'num_questions_per_level': num_questions_per_level,
+            'topic_prompt': topic_prompt,
+        },
+    )
+
+
+def worker_name():
+    return f"{socket.gethostname()}:{os.getpid()}:{threading.current_thread().name}"
+
+
+def claim_next_job(worker):
+    """Atomically move the oldest queued job to running and return it (or None)."""
+    candidate_ids = GenerationJob.objects.filter(
+        status=GenerationJob.QUEUED
+    ).order_by('created_at').values_list('id', flat=True)[:10]
+
+    for job_id in candidate_ids:
+        now = timezone.now()
+        # Only one worker can win the QUEUED -> RUNNING transition for a row
+        claimed = GenerationJob.objects.filter(id=job_id, status=GenerationJob.QUEUED).update(
+            status=GenerationJob.RUNNING, worker=worker, started_at=now, heartbeat_at=now
+        )
+        if claimed:
+            return GenerationJob.objects.select_related('exam').get(id=job_id)
+    return None
+
+
+def requeue_stale_jobs(timeout=None):
+    """Put running jobs whose worker stopped sending heartbeats back in the queue."""
+    timeout = timeout or getattr(settings, 'EXAM_GENERATION_STALE_AFTER', 600)
+    cutoff = timezone.now() - timedelta(seconds=timeout)
+    return GenerationJob.objects.filter(
+        status=GenerationJob.RUNNING, heartbeat_at__lt=cutoff
+    ).update(status=GenerationJob.QUEUED, worker='')
+
+
+class JobLost(Exception):
+    """The job was re-queued (e.g. after missed heartbeats) and belongs to another worker now."""
+
+
+def run_job(job):
+    """
+    Generate the questions for a claimed job and record the outcome. Progress
+    and outcome are only written while `job.worker` still owns the job; a
+    worker that lost it stops generating and leaves the job to its new owner.
+    """
+    params = job.params
+    exam = job.exam
+    owned = GenerationJob.objects.filter(id=job.id, worker=job.worker, status=GenerationJob.RUNNING)
+
+    def report_progress(questions_created):
+        if not owned.update(questions_created=questions_created, heartbeat_at=timezone.now()):
+            raise JobLost()
+
+    try:
+        if exam.pdf_document:
+            text = get_pdf_text(exam.pdf_document, job.teacher, title=exam.title)
+        else:
+            text = params.get('topic_prompt', '')
+
+        controller = generate_exam_questions(
+            exam,
+            text,
+            params['skills'],
+            num_questions_per_level=params['num_questions_per_level'],
+            num_options=params['num_options'],
+            progress=report_progress,
+        )
+        questions_created = controller.questions_created
+        shortfalls = controller.shortfalls()
+        # Buckets that ran out of attempt/token budget leave a partial exam
+        status = GenerationJob.PARTIAL if shortfalls else GenerationJob.DONE
+        error = ''
+    except JobLost:
+        print(f"Generation job {job.id} was re-queued; {job.worker} stops working on it")
+        job.refresh_from_db()
+        return job
+    except Exception as e:
+        print(f"Generation job {job.id} failed: {e}")
+        questions_created = exam.questions.count()
+        shortfalls = {}
+        status, error = GenerationJob.FAILED, str(e)
+
+    owned.update(
+        status=status,
+        error=error,
+        questions_created=questions_created,
+        shortfalls=shortfalls,
+        finished_at=timezone.now(),
+    )
+    print(f"Generation job {job.id} finished as {status}; LLM cache {get_llm_cache().stats()}")
+    job.refresh_from_db()
+    return job
+
+
+def run_worker(stop_event, poll_interval=2.0, once=False):
+    """
+    Claim and run jobs until `stop_event` is set (or the queue is empty with
+    `once`). Between jobs the worker also re-queues jobs of crashed workers,
+    checking every half EXAM_GENERATION_STALE_AFTER.
+    """
+    name = worker_name()
+    requeue_every = getattr(settings, 'EXAM_GENERATION_STALE_AFTER', 600) / 2
+    next_requeue = 0.0
+    try:
+        while not stop_event.is_set():
+            close_old_connections()
+            if time.monotonic() >= next_requeue:
+                requeued = requeue_stale_jobs()
+                if requeued:
+                    print(f"{name} re-queued {requeued} stale generation job(s)")
+                next_requeue = time.monotonic() + requeue_every
+            job = claim_next_job(name)
+            if job is None:
+                if once:
+                    break
+                stop_event.wait(poll_interval)
+                continue
+            run_job(job)
+    finally:
+        connection.close()
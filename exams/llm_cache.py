@@ -0,0 +1,248 @@
+"""
+Content-addressed cache for LLM completions.
+
+Completions are keyed by a SHA-256 of (model, prompt template version, input
+text, parameters), so regenerating an exam from the same material returns the
+stored response instead of calling the model again. The backend is chosen with
+the LLM_CACHE setting:
+
+    LLM_CACHE = {
+        'BACKEND': 'disk',      # 'disk', 'django' or 'sqlite'
+        'LOCATION': ...,        # directory (disk), cache alias (django, 'default' unless a str) or db file (sqlite)
+        'TTL': 30 * 86400,      # seconds an entry stays valid (None = forever)
+        'MAX_ENTRIES': 5000,    # least recently used entries are evicted above this
+        'BYPASS': False,        # skip the cache entirely
+    }
+"""
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+
+from django.conf import settings
+from django.core.cache import caches
+
+
+def make_key(model, version, text, params):
+    payload = json.dumps([model, version, text, params], sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+class DiskCache:
+    """One JSON file per entry; file mtimes double as the LRU clock."""
+
+    def __init__(self, location, ttl=None, max_entries=5000):
+        self.directory = Path(location)
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+
+    def _path(self, key):
+        return self.directory / key[:2] / f"{key}.json"
+
+    def get(self, key):
+        path = self._path(key)
+        try:
+            with open(path, encoding='utf-8') as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if entry['expires'] is not None and entry['expires'] < time.time():
+            path.unlink(missing_ok=True)
+            return None
+        os.utime(path)  # mark as recently used
+        return entry['value']
+
+    def set(self, key, value):
+        path = self._path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        expires = time.time() + self.ttl if self.ttl else None
+        tmp_path = path.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'expires': expires, 'value': value}, f)
+        os.replace(tmp_path, path)
+        self._evict()
+
+    def _evict(self):
+        with self._lock:
+            files = list(self.directory.glob('*/*.json'))
+            if len(files) <= self.max_entries:
+                return
+            files.sort(key=lambda p: p.stat().st_mtime)
+            for path in files[:len(files) - self.max_entries]:
+                path.unlink(missing_ok=True)
+
+    def clear(self):
+        for path in self.directory.glob('*/*.json'):
+            path.unlink(missing_ok=True)
+
+
+class DjangoCache:
+    """
+    Delegates to a configured Django cache; TTL and eviction are handled by that backend.
+    Django caches can't list keys by prefix, so keys carry a generation number
+    kept in the same cache: clear() bumps it, which retires every cached
+    completion without touching the alias's other entries (exam papers,
+    dashboard fragments, sessions).
+    """
+
+    GENERATION_KEY = 'llm:generation'
+
+    def __init__(self, location='default', ttl=None, max_entries=None):
+        if not isinstance(location, str):
+            location = 'default'  # the shipped LOCATION is the disk backend's directory, not a cache alias
+        self.cache = caches[location]
+        self.ttl = ttl
+
+    def _key(self, key):
+        generation = self.cache.get_or_set(self.GENERATION_KEY, 1, timeout=None)
+        return f"llm:{generation}:{key}"
+
+    def get(self, key):
+        return self.cache.get(self._key(key))
+
+    def set(self, key, value):
+        self.cache.set(self._key(key), value, timeout=self.ttl)
+
+    def clear(self):
+        try:
+            self.cache.incr(self.GENERATION_KEY)
+        except ValueError:  # not set yet (or evicted)
+            self.cache.set(self.GENERATION_KEY, 2, timeout=None)
+
+
+class SQLiteCache:
+    """A standalone SQLite file, separate from the application database."""
+
+    def __init__(self, location, ttl=None, max_entries=5000):
+        self.path = str(location)
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS llm_cache "
+            "(key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL, accessed_at REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS llm_cache_accessed ON llm_cache (accessed_at)")
+        self._conn.commit()
+
+    def get(self, key):
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute("SELECT value, expires_at FROM llm_cache WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            if row[1] is not None and row[1] < now:
+                self._conn.execute("DELETE FROM llm_cache WHERE key = ?", (key,))
+                self._conn.commit()
+                return None
+            self._conn.execute("UPDATE llm_cache SET accessed_at = ? WHERE key = ?", (now, key))
+            self._conn.commit()
+            return row[0]
+
+    def set(self, key, value):
+        now = time.time()
+        expires = now + self.ttl if self.ttl else None
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO llm_cache (key, value, expires_at, accessed_at) VALUES (?, ?, ?, ?)",
+                (key, value, expires, now),
+            )
+            # Drop expired rows, then the least recently used ones above the limit
+            self._conn.execute("DELETE FROM llm_cache WHERE expires_at IS NOT NULL AND expires_at < ?", (now,))
+            self._conn.execute(
+                "DELETE FROM llm_cache WHERE key IN "
+                "(SELECT key FROM llm_cache ORDER BY accessed_at DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,),
+            )
+            self._conn.commit()
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM llm_cache")
+            self._conn.commit()
+
+
+BACKENDS = {
+    'disk': DiskCache,
+    'django': DjangoCache,
+    'sqlite': SQLiteCache,
+}
+
+
+class LLMCache:
+    """Front end for the configured backend that also keeps hit/miss counters."""
+
+    def __init__(self, backend, bypass=False):
+        self.backend = backend
+        self.bypass = bypass
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def lookup(self, model, version, text, params, use_cache=True):
+        """Return the cached completion for these inputs, or None (counted as a miss)."""
+        if self.bypass or not use_cache:
+            return None
+
+        try:
+            cached = self.backend.get(make_key(model, version, text, params))
+        except Exception as e:
+            print(f"LLM cache read failed: {e}")
+            cached = None
+
+        with self._lock:
+            if cached is not None:
+                self.hits += 1
+            else:
+                self.misses += 1
+        return cached
+
+    def store(self, model, version, text, params, value, use_cache=True):
+        if self.bypass or not use_cache or not value:  # never cache empty completions
+            return
+        try:
+            self.backend.set(make_key(model, version, text, params), value)
+        except Exception as e:
+            print(f"LLM cache write failed: {e}")
+
+    def get_or_call(self, model, version, text, params, call, use_cache=True):
+        """Return the cached completion for these inputs, or `call()` it and store the result."""
+        cached = self.lookup(model, version, text, params, use_cache=use_cache)
+        if cached is not None:
+            return cached
+
+        value = call()
+        self.store(model, version, text, params, value, use_cache=use_cache)
+        return value
+
+    def stats(self):
+        with self._lock:
+            return {'hits': self.hits, 'misses': self.misses}
+
+    def clear(self):
+        self.backend.clear()
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_llm_cache():
+    """Return the process-wide LLMCache built from the LLM_CACHE setting."""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            config = getattr(settings, 'LLM_CACHE', {})
+            backend_class = BACKENDS[config.get('BACKEND', 'disk')]
+            backend = backend_class(
+                config.get('LOCATION', Path(settings.BASE_DIR) / 'llm_cache'),
+                ttl=config.get('TTL'),
+                max_entries=config.get('MAX_ENTRIES', 5000),
+            )
+            _cache = LLMCache(backend, bypass=config.get('BYPASS', False))
+        return _cache
@@ -0,0 +1,50 @@
+from collections import defaultdict
+
+from django.core.management.base import BaseCommand
+
+from exams.grading import answer_key
+from exams.models import StudentExamAttempt, StudentResponse
+
+
+class Command(BaseCommand):
+    help = (
+        "Fill StudentExamAttempt.topic_stats for completed attempts recorded before "
+        "the per-topic breakdown was stored at submit time."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--all', action='store_true', help="Recompute attempts that already have topic stats.")
+        parser.add_argument('--batch-size', type=int, default=500)
+
+    def handle(self, *args, **options):
+        attempts = StudentExamAttempt.objects.filter(score__isnull=False, exam__isnull=False).select_related('exam')
+        if not options['all']:
+            attempts = attempts.filter(topic_stats={})
+
+        batch_size = options['batch_size']
+        updated = 0
+        batch = []
+        for attempt in attempts.order_by('id').iterator(chunk_size=batch_size):
+            batch.append(attempt)
+            if len(batch) >= batch_size:
+                updated += self.backfill(batch)
+                batch = []
+        if batch:
+            updated += self.backfill(batch)
+
+        self.stdout.write(f"Topic stats written for {updated} attempt(s).")
+
+    def backfill(self, attempts):
+        # One query for the (question, choice) pairs of the whole batch
+        responses = defaultdict(list)
+        rows = StudentResponse.objects.filter(
+            student_id__in={attempt.student_id for attempt in attempts},
+            exam_id__in={attempt.exam_id for attempt in attempts},
+        ).values_list('student_id', 'exam_id', 'question_id', 'selected_choice_id')
+        for student_id, exam_id, question_id, choice_id in rows:
+            responses[student_id, exam_id].append((question_id, choice_id))
+
+        for attempt in attempts:
+            attempt.topic_stats = answer_key(attempt.exam).grade(responses[attempt.student_id, attempt.exam_id]).topics
+        StudentExamAttempt.objects.bulk_update(attempts, ['topic_stats'])
+        return len(attempts)
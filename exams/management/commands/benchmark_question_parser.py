@@ -0,0 +1,85 @@
+import json
+import time
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from exams.parsing import QuestionStreamParser
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark the question parser over recorded LLM responses: whole-response "
+        "parsing, chunked (streamed) parsing and how early the first question is emitted."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--corpus', help="Directory of recorded responses (*.txt). "
+                                             "Defaults to the completions in the disk LLM cache.")
+        parser.add_argument('--num-options', type=int, default=4)
+        parser.add_argument('--chunk-size', type=int, default=16,
+                            help="Characters per fed chunk when simulating a stream.")
+        parser.add_argument('--repeat', type=int, default=20)
+
+    def load_corpus(self, corpus):
+        if corpus:
+            return [path.read_text(encoding='utf-8') for path in sorted(Path(corpus).glob('*.txt'))]
+
+        config = getattr(settings, 'LLM_CACHE', {})
+        if config.get('BACKEND', 'disk') != 'disk':
+            raise CommandError("Pass --corpus: the configured LLM cache is not a disk cache.")
+        location = Path(config.get('LOCATION', Path(settings.BASE_DIR) / 'llm_cache'))
+        responses = []
+        for path in sorted(location.glob('*/*.json')):
+            value = json.loads(path.read_text(encoding='utf-8'))['value']
+            if 'Question' in value:  # skip cached skill lists
+                responses.append(value)
+        return responses
+
+    def handle(self, *args, **options):
+        responses = self.load_corpus(options['corpus'])
+        if not responses:
+            raise CommandError("No recorded responses found.")
+
+        num_options, chunk_size, repeat = options['num_options'], options['chunk_size'], options['repeat']
+        total_chars = sum(len(response) for response in responses)
+
+        def parse_whole():
+            count = 0
+            for response in responses:
+                parser = QuestionStreamParser(num_options)
+                count += len(parser.feed(response)) + len(parser.close())
+            return count
+
+        def parse_streamed():
+            count, first_offsets = 0, []
+            for response in responses:
+                parser = QuestionStreamParser(num_options)
+                first = None
+                for offset in range(0, len(response), chunk_size):
+                    emitted = parser.feed(response[offset:offset + chunk_size])
+                    if emitted and first is None:
+                        first = min(offset + chunk_size, len(response))
+                    count += len(emitted)
+                count += len(parser.close())
+                first_offsets.append((first or len(response)) / max(len(response), 1))
+            return count, first_offsets
+
+        start = time.perf_counter()
+        for _ in range(repeat):
+            questions = parse_whole()
+        whole_seconds = (time.perf_counter() - start) / repeat
+
+        start = time.perf_counter()
+        for _ in range(repeat):
+            streamed_questions, first_offsets = parse_streamed()
+        streamed_seconds = (time.perf_counter() - start) / repeat
+
+        self.stdout.write(f"Responses: {len(responses)} ({total_chars} characters), questions parsed: {questions}")
+        self.stdout.write(f"Whole response: {whole_seconds * 1000:.2f} ms per pass "
+                          f"({total_chars / whole_seconds / 1e6:.1f} M chars/s)")
+        self.stdout.write(f"Streamed in {chunk_size}-char chunks: {streamed_seconds * 1000:.2f} ms per pass "
+                          f"({streamed_questions} questions)")
+        self.stdout.write(f"First question emitted after {100 * sum(first_offsets) / len(first_offsets):.1f}% "
+                          f"of the response on average")
@@ -0,0 +1,28 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from exams.models import ExamSession
+
+
+class Command(BaseCommand):
+    help = (
+        "Remove expired login sessions and in-progress exams (ExamSession rows) nobody has touched "
+        "for EXAM_SESSION_MAX_AGE seconds. Run it daily, e.g. from cron, outside exam windows."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--max-age', type=int, default=getattr(settings, 'EXAM_SESSION_MAX_AGE', 7 * 86400),
+            help="Seconds since the last answer after which an in-progress exam is discarded.")
+
+    def handle(self, *args, **options):
+        # Database and file sessions are deleted here; the cache backends expire their own entries
+        call_command('clearsessions')
+
+        cutoff = timezone.now() - timedelta(seconds=options['max_age'])
+        deleted, _ = ExamSession.objects.filter(updated_at__lt=cutoff).delete()
+        self.stdout.write(f"Expired sessions cleared; {deleted} abandoned exam session(s) removed.")
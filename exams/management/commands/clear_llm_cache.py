@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from exams.llm_cache import get_llm_cache
+
+
+class Command(BaseCommand):
+    help = "Remove every cached LLM completion so the next generation calls the model again."
+
+    def handle(self, *args, **options):
+        get_llm_cache().clear()
+        self.stdout.write("LLM cache cleared.")
@@ -0,0 +1,114 @@
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+from django.db import OperationalError, connections, transaction
+
+from exams.models import AnswerChoice, Exam, Question, StudentExamAttempt, StudentResponse
+
+
+class Command(BaseCommand):
+    help = (
+        "Measure write throughput under concurrent exam submissions and question inserts. "
+        "By default it compares SQLite with default journaling against the tuned SQLite "
+        "settings (WAL etc.) on throwaway databases; --use-default-db runs the same load "
+        "against the configured database (e.g. PostgreSQL) and removes its test rows afterwards."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', type=int, default=8, help="Concurrent clients.")
+        parser.add_argument('--seconds', type=float, default=5.0, help="Duration of each run.")
+        parser.add_argument('--questions', type=int, default=30, help="Answers stored per submission.")
+        parser.add_argument('--use-default-db', action='store_true')
+
+    def handle(self, *args, **options):
+        if options['use_default_db']:
+            self.report('default database', self.run('default', options))
+            return
+
+        with tempfile.TemporaryDirectory() as directory:
+            runs = [
+                ('SQLite, default journaling', {}),
+                ('SQLite, WAL + tuned pragmas', getattr(settings, 'SQLITE_OPTIONS', {})),
+            ]
+            for index, (label, sqlite_options) in enumerate(runs):
+                alias = f'load_test_{index}'
+                self.add_database(alias, {
+                    'ENGINE': 'django.db.backends.sqlite3',
+                    'NAME': Path(directory) / f'{alias}.sqlite3',
+                    'OPTIONS': sqlite_options,
+                })
+                call_command('migrate', database=alias, verbosity=0)
+                self.report(label, self.run(alias, options))
+                connections[alias].close()
+
+    def add_database(self, alias, config):
+        databases = dict(connections.settings)
+        databases[alias] = config
+        connections.settings[alias] = connections.configure_settings(databases)[alias]
+
+    def run(self, alias, options):
+        """Run the load against `alias`; returns (operations, errors, seconds)."""
+        User = get_user_model()
+        teacher = User.objects.db_manager(alias).create_user('load_test_teacher', password=None, is_teacher=True)
+        try:
+            exam = Exam.objects.using(alias).create(teacher=teacher, title='Load test')
+            questions = Question.objects.using(alias).bulk_create([
+                Question(exam=exam, text=f'Question {i}', difficulty='Easy', topic='load')
+                for i in range(options['questions'])
+            ])
+            choices = AnswerChoice.objects.using(alias).bulk_create([
+                AnswerChoice(question=question, text='Choice', is_correct=True) for question in questions
+            ])
+            students = [
+                User.objects.db_manager(alias).create_user(f'load_test_student_{i}', password=None, is_student=True)
+                for i in range(options['threads'])
+            ]
+
+            counts = {'operations': 0, 'errors': 0}
+            lock = threading.Lock()
+            deadline = time.monotonic() + options['seconds']
+
+            def client(student):
+                try:
+                    while time.monotonic() < deadline:
+                        try:
+                            # An end-of-exam submission (see exams/attempts.py) ...
+                            with transaction.atomic(using=alias):
+                                StudentResponse.objects.using(alias).filter(student=student, exam=exam).delete()
+                                StudentResponse.objects.using(alias).bulk_create([
+                                    StudentResponse(student=student, exam=exam, question=question, selected_choice=choice)
+                                    for question, choice in zip(questions, choices)
+                                ])
+                                StudentExamAttempt.objects.using(alias).update_or_create(
+                                    student=student, exam=exam, defaults={'score': 100.0})
+                            # ... and a single-row write like those of question generation
+                            Question.objects.using(alias).filter(pk=questions[0].pk).update(topic='load')
+                            with lock:
+                                counts['operations'] += 1
+                        except OperationalError:  # "database is locked"
+                            with lock:
+                                counts['errors'] += 1
+                finally:
+                    connections[alias].close()
+
+            started = time.monotonic()
+            threads = [threading.Thread(target=client, args=(student,)) for student in students]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            return counts['operations'], counts['errors'], time.monotonic() - started
+        finally:
+            # Cascades to the exam, questions, responses and attempts
+            User.objects.using(alias).filter(username__startswith='load_test_').delete()
+
+    def report(self, label, result):
+        operations, errors, seconds = result
+        self.stdout.write(f"{label}: {operations / seconds:.1f} submissions/s "
+                          f"({operations} in {seconds:.1f}s, {errors} failed with lock errors)")
@@ -0,0 +1,42 @@
+import threading
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from exams.jobs import run_worker
+
+
+class Command(BaseCommand):
+    help = "Run a pool of worker threads that process queued exam generation jobs."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=getattr(settings, 'EXAM_GENERATION_WORKERS', 2),
+                            help="Number of worker threads to start.")
+        parser.add_argument('--poll-interval', type=float, default=2.0,
+                            help="Seconds to wait before polling an empty queue again.")
+        parser.add_argument('--once', action='store_true',
+                            help="Exit once the queue is empty instead of polling forever.")
+
+    def handle(self, *args, **options):
+        stop_event = threading.Event()
+        threads = [
+            threading.Thread(
+                target=run_worker,
+                kwargs={'stop_event': stop_event, 'poll_interval': options['poll_interval'], 'once': options['once']},
+                name=f"generation-worker-{i + 1}",
+            )
+            for i in range(options['workers'])
+        ]
+        for thread in threads:
+            thread.start()
+        self.stdout.write(f"Started {len(threads)} generation worker(s).")
+
+        try:
+            for thread in threads:
+                while thread.is_alive():
+                    thread.join(timeout=1.0)
+        except KeyboardInterrupt:
+            self.stdout.write("Stopping workers after their current job...")
+            stop_event.set()
+            for thread in threads:
+                thread.join()
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-18 18:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('exams', '0024_pdfdocument_text_cache'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='exam',
+            name='paper_version',
+            field=models.PositiveIntegerField(default=1),
+        ),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 5.2.18 on 2026-10-18 18:04
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('exams', '0025_exam_paper_version'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ExamSession',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('position', models.PositiveIntegerField(default=0)),
+                ('unlocked_levels', models.PositiveSmallIntegerField(default=1)),
+                ('choice_ids', models.TextField(blank=True, default='')),
+                ('easy_correct', models.PositiveIntegerField(default=0)),
+                ('easy_total', models.PositiveIntegerField(default=0)),
+                ('medium_correct', models.PositiveIntegerField(default=0)),
+                ('medium_total', models.PositiveIntegerField(default=0)),
+                ('hard_correct', models.PositiveIntegerField(default=0)),
+                ('hard_total', models.PositiveIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('exam', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='sessions', to='exams.exam')),
+                ('student', models.ForeignKey(limit_choices_to={'is_student': True}, on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'unique_together': {('student', 'exam')},
+            },
+        ),
+    ]
@@ -0,0 +1,42 @@
+# Generated by Django 5.2.18 on 2026-10-18 18:13
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Max
+
+
+def remove_duplicate_attempts(apps, schema_editor):
+    # Keep the newest attempt of each student/exam pair so the unique constraint can be added
+    StudentExamAttempt = apps.get_model('exams', 'StudentExamAttempt')
+    attempts = StudentExamAttempt.objects.using(schema_editor.connection.alias)
+    duplicates = (
+        attempts.values('student', 'exam')
+        .annotate(newest=Max('id'), count=models.Count('id'))
+        .filter(count__gt=1)
+    )
+    for row in duplicates:
+        attempts.filter(student=row['student'], exam=row['exam']).exclude(id=row['newest']).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('exams', '0028_dashboard_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RunPython(remove_duplicate_attempts, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='question',
+            index=models.Index(fields=['exam', 'difficulty', 'id'], name='question_exam_level_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='studentresponse',
+            index=models.Index(fields=['student', 'exam'], name='response_student_exam_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='studentexamattempt',
+            constraint=models.UniqueConstraint(fields=('student', 'exam'), name='unique_attempt_per_student_exam'),
+        ),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 5.2.18 on 2026-10-18 18:34
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+
+
+def copy_exam_teacher(apps, schema_editor):
+    Exam = apps.get_model('exams', 'Exam')
+    StudentExamAttempt = apps.get_model('exams', 'StudentExamAttempt')
+    alias = schema_editor.connection.alias
+    StudentExamAttempt.objects.using(alias).update(
+        teacher=Subquery(Exam.objects.using(alias).filter(id=OuterRef('exam_id')).values('teacher_id')[:1])
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('exams', '0030_exam_source_sha256'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='studentexamattempt',
+            name='teacher',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.RunPython(copy_exam_teacher, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='studentexamattempt',
+            index=models.Index(fields=['teacher', '-id'], name='attempt_teacher_id_idx'),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-18 18:53
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('exams', '0032_generation_job_teacher_index'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AlterUniqueTogether(
+            name='examsession',
+            unique_together=set(),
+        ),
+        migrations.AddConstraint(
+            model_name='examsession',
+            constraint=models.UniqueConstraint(fields=('student', 'exam'), name='unique_session_per_student_exam'),
+        ),
+    ]
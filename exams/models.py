@@ -1,5 +1,7 @@
 from django.db import models
+from django.db.models.functions import Concat
 from django.contrib.auth import get_user_model
+from django.utils import timezone
 
 User = get_user_model() 
 class PDFDocument(models.Model):
@@ -7,6 +9,8 @@ class PDFDocument(models.Model):
     title = models.CharField(max_length=255)
     pdf_file = models.FileField(upload_to='pdfs/')
     uploaded_at = models.DateTimeField(auto_now_add=True)
+    sha256 = models.CharField(max_length=64, blank=True, db_index=True)  # Content hash used as the text cache key
+    extracted_text = models.TextField(blank=True)  # Cached text of pdf_file (see exams/pdf_text.py)
 
     def __str__(self):
         return self.title
@@ -18,6 +22,11 @@ class StudentResponse(models.Model):
     selected_choice = models.ForeignKey('AnswerChoice', on_delete=models.SET_NULL, null=True, blank=True)
     submitted_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['student', 'exam'], name='response_student_exam_idx'),  # reports, finalize, delete
+        ]
+
     def __str__(self):
         return f"{self.student.username} - {self.exam.title if self.exam else 'Exam Deleted'} - {self.question.text[:30]}"
 
@@ -29,6 +38,13 @@ class Exam(models.Model):
     pdf_document = models.FileField(upload_to='pdfs/', null=True, blank=True)
     skills = models.JSONField(default=list)  # Store skills as a list
     created_at = models.DateTimeField(auto_now_add=True)
+    paper_version = models.PositiveIntegerField(default=1)  # Bumped when questions change (see exams/paper.py)
+    source_sha256 = models.CharField(max_length=64, blank=True, db_index=True)  # Hash of the text questions were generated from (see exams/dedup.py)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['teacher', '-id'], name='exam_teacher_id_idx'),  # teacher dashboard keyset pages
+        ]
 
     def __str__(self):
         return self.title
@@ -41,6 +57,11 @@ class Question(models.Model):
     difficulty = models.CharField(max_length=10, choices=[('Easy', 'Easy'), ('Medium', 'Medium'), ('Hard', 'Hard')])
     topic = models.CharField(max_length=255)  # Add this field to track topics
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['exam', 'difficulty', 'id'], name='question_exam_level_idx'),  # exam paper order
+        ]
+
     def __str__(self):
         return self.text
 
@@ -56,6 +77,8 @@ class AnswerChoice(models.Model):
 class StudentExamAttempt(models.Model):
     student = models.ForeignKey(User, on_delete=models.CASCADE, limit_choices_to={'is_student': True})
     exam = models.ForeignKey(Exam, on_delete=models.CASCADE)
+    # Copy of exam.teacher, so the teacher dashboard can page through attempts on an index
+    teacher = models.ForeignKey(User, on_delete=models.CASCADE, null=True, blank=True, related_name='+')
     start_time = models.DateTimeField(auto_now_add=True)
     end_time = models.DateTimeField(null=True, blank=True)
     score = models.FloatField(null=True, blank=True)
@@ -68,6 +91,148 @@ class StudentExamAttempt(models.Model):
     hard_total = models.IntegerField(default=0)
     eligibility = models.CharField(max_length=20, default='Needs Improvement')
     feedback = models.TextField(blank=True, null=True) # Added feedback field
+    topic_stats = models.JSONField(default=dict, blank=True)  # topic -> easy_marks/easy_total/... written at submit time
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['exam', 'score'], name='attempt_exam_score_idx'),  # completed attempts of an exam
+            models.Index(fields=['exam', '-id'], name='attempt_exam_id_idx'),  # teacher dashboard keyset pages (?exam=)
+            models.Index(fields=['teacher', '-id'], name='attempt_teacher_id_idx'),  # teacher dashboard keyset pages
+        ]
+        constraints = [
+            # One attempt per student and exam; also serves the take_exam "already completed" lookup
+            models.UniqueConstraint(fields=['student', 'exam'], name='unique_attempt_per_student_exam'),
+        ]
+
+    def save(self, *args, **kwargs):
+        if self.teacher_id is None and self.exam_id is not None:
+            self.teacher_id = Exam.objects.filter(id=self.exam_id).values_list('teacher_id', flat=True).first()
+        super().save(*args, **kwargs)
+
+    def __str__(self):
+        return f"{self.student.username} - {self.exam.title}"
+
+class GenerationJob(models.Model):
+    """A queued request to generate the questions of an exam in the background."""
+    QUEUED = 'queued'
+    RUNNING = 'running'
+    PARTIAL = 'partial'
+    DONE = 'done'
+    FAILED = 'failed'
+    STATUS_CHOICES = [
+        (QUEUED, 'Queued'),
+        (RUNNING, 'Running'),
+        (PARTIAL, 'Partial'),
+        (DONE, 'Done'),
+        (FAILED, 'Failed'),
+    ]
+    FINISHED_STATUSES = (PARTIAL, DONE, FAILED)
+
+    exam = models.ForeignKey(Exam, on_delete=models.CASCADE, related_name='generation_jobs')
+    teacher = models.ForeignKey(User, on_delete=models.CASCADE, limit_choices_to={'is_teacher': True})
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=QUEUED, db_index=True)
+    params = models.JSONField(default=dict)  # skills, num_options, num_questions_per_level, topic_prompt
+    questions_created = models.IntegerField(default=0)
+    shortfalls = models.JSONField(default=dict, blank=True)  # "skill - level" -> questions still missing (partial exams)
+    error = models.TextField(blank=True)
+    worker = models.CharField(max_length=255, blank=True)  # host:pid/thread of the worker running the job
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    heartbeat_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['teacher', '-created_at'], name='job_teacher_created_idx'),  # teacher dashboard
+        ]
+
+    @property
+    def is_finished(self):
+        return self.status in self.FINISHED_STATUSES
+
+    def __str__(self):
+        return f"{self.exam.title} - {self.status}"
+
+
+class ExamSession(models.Model):
+    """
+    In-progress state of a student's exam, kept out of the Django session.
+    Answers are packed as a comma-terminated list of choice ids and scored
+    through per-level counters, so each answer is a single constant-size UPDATE.
+    """
+    LEVELS = ('easy', 'medium', 'hard')
+
+    student = models.ForeignKey(User, on_delete=models.CASCADE, limit_choices_to={'is_student': True})
+    exam = models.ForeignKey(Exam, on_delete=models.CASCADE, related_name='sessions')
+    position = models.PositiveIntegerField(default=0)  # Index of the current question among the unlocked ones
+    unlocked_levels = models.PositiveSmallIntegerField(default=1)  # 1 = easy, 2 = + medium, 3 = + hard
+    choice_ids = models.TextField(default='', blank=True)  # "12,57,90," - selected choices in answer order
+    easy_correct = models.PositiveIntegerField(default=0)
+    easy_total = models.PositiveIntegerField(default=0)
+    medium_correct = models.PositiveIntegerField(default=0)
+    medium_total = models.PositiveIntegerField(default=0)
+    hard_correct = models.PositiveIntegerField(default=0)
+    hard_total = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            # One exam in progress per student and exam; also serves the lookup when an exam is opened
+            models.UniqueConstraint(fields=['student', 'exam'], name='unique_session_per_student_exam'),
+        ]
+
+    @property
+    def allowed_levels(self):
+        return list(self.LEVELS[:self.unlocked_levels])
+
+    def selected_choice_ids(self):
+        return [int(choice_id) for choice_id in self.choice_ids.split(',') if choice_id]
+
+    def level_counts(self):
+        """Return ({level: correct}, {level: total})."""
+        correct = {level: getattr(self, f"{level}_correct") for level in self.LEVELS}
+        total = {level: getattr(self, f"{level}_total") for level in self.LEVELS}
+        return correct, total
+
+    def record_answer(self, choice_id, level, correct):
+        return self.record_answers([(choice_id, level, correct)])
+
+    def record_answers(self, answers):
+        """
+        Append [(choice_id, level, correct), ...] with a single UPDATE of the
+        changed columns. The update only applies while the session is still at
+        self.position, so a resubmitted form is not counted twice. Returns
+        False in that case.
+        """
+        packed = "".join(f"{choice_id}," for choice_id, _, _ in answers)
+        totals = {level: 0 for level in self.LEVELS}
+        corrects = {level: 0 for level in self.LEVELS}
+        for _, level, correct in answers:
+            totals[level] += 1
+            corrects[level] += bool(correct)
+
+        delta = {
+            'position': models.F('position') + len(answers),
+            'choice_ids': Concat(models.F('choice_ids'), models.Value(packed)),
+            'updated_at': timezone.now(),
+        }
+        for level in self.LEVELS:
+            if totals[level]:
+                delta[f"{level}_total"] = models.F(f"{level}_total") + totals[level]
+            if corrects[level]:
+                delta[f"{level}_correct"] = models.F(f"{level}_correct") + corrects[level]
+        updated = ExamSession.objects.filter(pk=self.pk, position=self.position).update(**delta)
+        if not updated:
+            return False
+
+        # Mirror the update locally instead of re-reading the row
+        self.position += len(answers)
+        self.choice_ids += packed
+        for level in self.LEVELS:
+            setattr(self, f"{level}_total", getattr(self, f"{level}_total") + totals[level])
+            setattr(self, f"{level}_correct", getattr(self, f"{level}_correct") + corrects[level])
+        return True
 
     def __str__(self):
-        return f"{self.student.username} - {self.exam.title}"
\ No newline at end of file
+        return f"{self.student.username} - {self.exam.title} (question {self.position + 1})"
@@ -0,0 +1,27 @@
+"""
+Keyset ("seek") pagination.
+
+Instead of OFFSET, which makes the database walk past every earlier row, the
+next page starts after the last primary key seen, so every page costs the
+same however deep the client scrolls. Rows are returned newest first.
+"""
+
+
+def keyset_page(queryset, after=None, per_page=25):
+    """
+    Return (rows, next_cursor) for the page of `queryset` following the row
+    with primary key `after` (the first page when it is empty or invalid).
+    next_cursor is None on the last page.
+    """
+    queryset = queryset.order_by('-pk')
+    try:
+        after = int(after) if after else None
+    except (TypeError, ValueError):
+        after = None
+    if after is not None:
+        queryset = queryset.filter(pk__lt=after)
+
+    rows = list(queryset[:per_page + 1])  # one extra row tells whether there is a next page
+    if len(rows) > per_page:
+        return rows[:per_page], rows[per_page - 1].pk
+    return rows, None
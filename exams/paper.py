@@ -0,0 +1,73 @@
+"""
+Precomputed exam "papers".
+
+A paper is an immutable snapshot of an exam's questions and answer choices,
+grouped by level, built with two queries and then kept in a process-local
+LRU and the shared Django cache. Papers are keyed by Exam.paper_version,
+which invalidate_paper() bumps whenever the questions change, so a stale
+paper is never served and take_exam needs no question queries per step.
+"""
+import threading
+from collections import OrderedDict, namedtuple
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import F
+
+from .models import Exam
+
+PaperChoice = namedtuple('PaperChoice', 'id text')
+PaperQuestion = namedtuple('PaperQuestion', 'id text difficulty topic choices correct_choice_id')
+Paper = namedtuple('Paper', 'exam_id version levels questions')  # levels: {'easy': (PaperQuestion, ...), ...}
+
+PAPER_LEVELS = ('easy', 'medium', 'hard')
+
+_local_papers = OrderedDict()
+_local_lock = threading.Lock()
+
+
+def _cache_key(exam_id, version):
+    return f"exam_paper:{exam_id}:{version}"
+
+
+def build_paper(exam):
+    """Load the exam's questions and choices (two queries) into a Paper."""
+    levels = {level: [] for level in PAPER_LEVELS}
+    questions = {}
+    for question in exam.questions.prefetch_related('answer_choices').order_by('difficulty', 'id'):
+        choices = tuple(PaperChoice(choice.id, choice.text) for choice in question.answer_choices.all())
+        correct = next((choice.id for choice in question.answer_choices.all() if choice.is_correct), None)
+        paper_question = PaperQuestion(question.id, question.text, question.difficulty, question.topic, choices, correct)
+        levels[question.difficulty.lower()].append(paper_question)
+        questions[question.id] = paper_question
+    return Paper(exam.id, exam.paper_version, {level: tuple(qs) for level, qs in levels.items()}, questions)
+
+
+def get_paper(exam):
+    """Return the current paper of `exam`, from the local LRU, the shared cache or the database."""
+    key = _cache_key(exam.id, exam.paper_version)
+    with _local_lock:
+        paper = _local_papers.get(key)
+        if paper is not None:
+            _local_papers.move_to_end(key)
+            return paper
+
+    paper = cache.get(key)
+    if paper is None:
+        paper = build_paper(exam)
+        cache.set(key, paper, timeout=getattr(settings, 'EXAM_PAPER_CACHE_TIMEOUT', 3600))
+
+    with _local_lock:
+        _local_papers[key] = paper
+        while len(_local_papers) > getattr(settings, 'EXAM_PAPER_CACHE_SIZE', 128):
+            _local_papers.popitem(last=False)
+    return paper
+
+
+def invalidate_paper(exam_id):
+    """Retire every cached paper of the exam after its questions or choices changed."""
+    Exam.objects.filter(id=exam_id).update(paper_version=F('paper_version') + 1)
+    prefix = f"exam_paper:{exam_id}:"
+    with _local_lock:
+        for key in [key for key in _local_papers if key.startswith(prefix)]:
+            del _local_papers[key]
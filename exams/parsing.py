@@ -0,0 +1,97 @@
+"""
+Incremental parser for generated multiple choice questions.
+
+The model answers in this line format (optionally grouped under
+"Level: Easy/Medium/Hard" headings for batched requests):
+
+    Question 1: What is the capital of France?
+    a. Berlin
+    b. Paris
+    Correct Answer: b
+
+QuestionStreamParser consumes the completion in arbitrary chunks (e.g. the
+deltas of a streamed response) and emits each question as soon as its
+"Correct Answer:" line arrives, so callers can deduplicate and save questions
+while the model is still writing the rest.
+"""
+import re
+
+QUESTION_RE = re.compile(r'^\**\s*Question\s+\d+\s*[:.]\**\s*(.*)$', re.IGNORECASE)
+CHOICE_RE = re.compile(r'^([a-z])[.)]\s*(.+)$')
+CORRECT_RE = re.compile(r'^\**\s*Correct Answer\s*:\**\s*\(?([a-z])\b', re.IGNORECASE)
+LEVEL_RE = re.compile(r'^[\s*#]*Level\s*:\s*\**\s*(Easy|Medium|Hard)\b', re.IGNORECASE)
+
+
+class QuestionStreamParser:
+    """
+    Feed completion text with feed(); every call returns the questions that
+    were completed by that chunk as (level, question) pairs, where level is
+    the current "Level:" heading (None outside batched responses) and
+    question is {'text': ..., 'answer_choices': [{'text', 'is_correct'}, ...]}.
+    Call close() at the end of the stream to process a final unterminated line.
+    """
+
+    def __init__(self, num_options):
+        self.num_options = num_options
+        self.level = None
+        self._buffer = ""
+        self._question = None
+        self._choices = []
+
+    def feed(self, chunk):
+        self._buffer += chunk
+        *lines, self._buffer = self._buffer.split("\n")
+        emitted = []
+        for line in lines:
+            question = self._parse_line(line.strip())
+            if question is not None:
+                emitted.append((self.level, question))
+        return emitted
+
+    def close(self):
+        line, self._buffer = self._buffer, ""
+        question = self._parse_line(line.strip())
+        return [(self.level, question)] if question is not None else []
+
+    def _parse_line(self, line):
+        if not line:
+            return None
+
+        match = QUESTION_RE.match(line)
+        if match:
+            self._question = match.group(1).strip() or None
+            self._choices = []
+            return None
+
+        if self._question is None:
+            match = LEVEL_RE.match(line)
+            if match:
+                self.level = match.group(1).capitalize()
+            return None
+
+        match = CORRECT_RE.match(line)
+        if match:
+            return self._finish(ord(match.group(1).lower()) - ord('a'))
+
+        match = CHOICE_RE.match(line)
+        if match:
+            self._choices.append(match.group(2).strip())
+            return None
+
+        match = LEVEL_RE.match(line)
+        if match:
+            # A new level started before the current question was answered
+            self._question, self._choices = None, []
+            self.level = match.group(1).capitalize()
+        return None
+
+    def _finish(self, correct_index):
+        question, choices = self._question, self._choices
+        self._question, self._choices = None, []
+        if len(choices) != self.num_options or not 0 <= correct_index < len(choices):
+            return None
+        return {
+            'text': question,
+            'answer_choices': [{'text': text, 'is_correct': i == correct_index} for i, text in enumerate(choices)],
+        }
+
@@ -0,0 +1,150 @@
+"""
+PDF text extraction.
+
+Uploads are read from disk (spooled to a temporary file if needed) through a
+memory map, page text is produced lazily, and the amount of text kept is
+capped. Large documents are split into page ranges that are extracted in a
+process pool, and the text of every PDF is cached on a PDFDocument row keyed by the
+file's SHA-256, so the same textbook is only parsed once no matter how many
+times it is uploaded (skill generation, exam creation, regeneration...).
+
+This module must stay importable without Django being set up: the extraction
+workers are spawned processes that only need PyPDF2.
+"""
+import hashlib
+import mmap
+import multiprocessing
+import os
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.db.models.fields.files import FieldFile
+from PyPDF2 import PdfReader
+
+
+def file_sha256(pdf_file):
+    """SHA-256 hex digest of an uploaded or stored file, read in chunks."""
+    digest = hashlib.sha256()
+    for chunk in pdf_file.chunks():
+        digest.update(chunk)
+    return digest.hexdigest()
+
+
+@contextmanager
+def spooled_pdf(pdf_file):
+    """
+    Yield a filesystem path for `pdf_file`. Files already on disk (temporary
+    uploads, local storage) are used in place; anything else is copied to a
+    temporary file chunk by chunk instead of being read into memory.
+    """
+    if hasattr(pdf_file, 'temporary_file_path'):
+        yield pdf_file.temporary_file_path()
+        return
+    try:
+        path = pdf_file.path  # FieldFile on local storage
+    except (AttributeError, NotImplementedError, ValueError):
+        path = None
+    if path and os.path.exists(path):
+        yield path
+        return
+
+    with tempfile.NamedTemporaryFile(suffix='.pdf') as spool:
+        for chunk in pdf_file.chunks():
+            spool.write(chunk)
+        spool.flush()
+        yield spool.name
+
+
+@contextmanager
+def open_pdf(path):
+    """A PdfReader over a read-only memory map, so pages are paged in by the OS on demand."""
+    with open(path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+        yield PdfReader(mapped)
+
+
+def iter_page_text(path, start=0, stop=None):
+    """Lazily yield the text of pages [start, stop) of the PDF at `path`."""
+    with open_pdf(path) as reader:
+        stop = len(reader.pages) if stop is None else stop
+        for i in range(start, stop):
+            yield reader.pages[i].extract_text() or ""
+
+
+def _take_chars(pages, max_chars):
+    """Consume `pages` only until `max_chars` characters of text have been collected."""
+    taken, total = [], 0
+    for page in pages:
+        taken.append(page)
+        total += len(page) + 1
+        if total >= max_chars:
+            break
+    return taken
+
+
+def _extract_page_range(path, start, stop, max_chars):
+    return _take_chars(iter_page_text(path, start, stop), max_chars)
+
+
+def extract_text_from_pdf(pdf_file):
+    """
+    Extract the text of the PDF; big documents are split across worker
+    processes. At most PDF_MAX_TEXT_CHARS characters are kept, so resident
+    memory stays bounded however large the document is.
+    """
+    workers = getattr(settings, 'PDF_EXTRACTION_WORKERS', min(os.cpu_count() or 1, 4))
+    min_pages = getattr(settings, 'PDF_PARALLEL_MIN_PAGES', 64)
+    max_chars = getattr(settings, 'PDF_MAX_TEXT_CHARS', 2_000_000)
+
+    with spooled_pdf(pdf_file) as path:
+        with open_pdf(path) as reader:
+            num_pages = len(reader.pages)
+
+        if workers <= 1 or num_pages < min_pages:
+            pages = _extract_page_range(path, 0, num_pages, max_chars)
+        else:
+            step = -(-num_pages // workers)  # ceil division
+            ranges = [(start, min(start + step, num_pages)) for start in range(0, num_pages, step)]
+            pages, total = [], 0
+            # spawn, not fork: the caller may be a threaded generation worker
+            with ProcessPoolExecutor(max_workers=len(ranges), mp_context=multiprocessing.get_context('spawn')) as executor:
+                futures = [executor.submit(_extract_page_range, path, start, stop, max_chars) for start, stop in ranges]
+                for future in futures:
+                    chunk = future.result()
+                    pages.extend(chunk)
+                    total += sum(len(page) + 1 for page in chunk)
+                    if total >= max_chars:
+                        for pending in futures:
+                            pending.cancel()
+                        break
+
+    return "\n".join(pages)[:max_chars]
+
+
+def get_pdf_text(pdf_file, teacher, title=None):
+    """
+    Return the text of `pdf_file`, extracting it only if no PDFDocument with
+    the same SHA-256 has been parsed before. Newly extracted text is stored on
+    a PDFDocument owned by `teacher`.
+    """
+    # Imported here so spawned extraction workers never load the models
+    from .models import PDFDocument
+
+    digest = file_sha256(pdf_file)
+    cached = PDFDocument.objects.filter(sha256=digest).exclude(extracted_text='').values_list(
+        'extracted_text', flat=True
+    ).first()
+    if cached is not None:
+        return cached
+
+    text = extract_text_from_pdf(pdf_file)
+    PDFDocument.objects.create(
+        teacher=teacher,
+        title=title or os.path.basename(pdf_file.name),
+        # An already stored file (e.g. Exam.pdf_document) is referenced by name, not copied
+        pdf_file=pdf_file.name if isinstance(pdf_file, FieldFile) else pdf_file,
+        sha256=digest,
+        extracted_text=text,
+    )
+    return text
@@ -0,0 +1,43 @@
+"""
+Bulk persistence of generated questions.
+
+Saving questions one by one costs one INSERT per question plus one per answer
+choice, each in its own autocommit transaction. save_generated_questions
+writes a whole batch with two bulk INSERTs inside a single transaction.
+"""
+from django.db import connection, transaction
+
+from .models import Question, AnswerChoice
+from .paper import invalidate_paper
+
+
+def save_generated_questions(exam, generated):
+    """
+    Save `generated` [(skill, level, q_data), ...] for `exam`, where q_data is
+    a parsed question dict ({'text': ..., 'answer_choices': [...]}).
+    Returns the saved Question objects.
+    """
+    if not generated:
+        return []
+
+    with transaction.atomic():
+        questions = [
+            Question(exam=exam, text=q_data['text'], difficulty=level, topic=skill)
+            for skill, level, q_data in generated
+        ]
+        # SQLite and PostgreSQL return the new primary keys from a bulk INSERT;
+        # on backends that can't, the questions are saved one by one instead.
+        if connection.features.can_return_rows_from_bulk_insert:
+            Question.objects.bulk_create(questions)
+        else:
+            for question in questions:
+                question.save()
+
+        AnswerChoice.objects.bulk_create([
+            AnswerChoice(question=question, text=choice_data['text'], is_correct=choice_data['is_correct'])
+            for question, (_, _, q_data) in zip(questions, generated)
+            for choice_data in q_data.get('answer_choices', [])
+        ])
+
+    invalidate_paper(exam.id)
+    return questions
@@ -0,0 +1,105 @@
+"""
+Offline lexical retrieval used to build question prompts.
+
+Instead of pasting a whole document into every skill/level prompt, long texts
+are split into chunks, indexed with BM25 over an in-memory inverted index, and
+only the chunks most relevant to a skill are sent with that skill's prompts.
+"""
+import heapq
+import math
+import re
+from collections import Counter, defaultdict
+
+from django.conf import settings
+
+TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+STOP_WORDS = frozenset("""
+a an and are as at be by for from has have in is it its of on or that the this to was were will with
+""".split())
+
+
+def tokenize(text):
+    return [token for token in TOKEN_RE.findall(text.lower()) if token not in STOP_WORDS]
+
+
+def chunk_text(text, chunk_chars=1500, overlap_chars=200):
+    """
+    Split `text` into chunks of roughly `chunk_chars` characters on word
+    boundaries, each overlapping the previous one by about `overlap_chars`.
+    """
+    words = text.split()
+    chunks, current, length, fresh = [], [], 0, 0
+    for word in words:
+        current.append(word)
+        length += len(word) + 1
+        fresh += 1
+        if length >= chunk_chars:
+            chunks.append(" ".join(current))
+            # Carry the tail of this chunk over so sentences cut at the boundary keep context
+            tail, tail_length = [], 0
+            for carried in reversed(current):
+                if tail_length >= overlap_chars:
+                    break
+                tail.append(carried)
+                tail_length += len(carried) + 1
+            current, length, fresh = tail[::-1], tail_length, 0
+    if fresh:
+        chunks.append(" ".join(current))
+    return chunks
+
+
+class BM25Index:
+    """Okapi BM25 over a token -> [(chunk index, term frequency)] inverted index."""
+
+    def __init__(self, chunks, k1=1.5, b=0.75):
+        self.chunks = chunks
+        self.k1 = k1
+        self.b = b
+        self.postings = defaultdict(list)
+        self.lengths = []
+        for index, chunk in enumerate(chunks):
+            counts = Counter(tokenize(chunk))
+            self.lengths.append(sum(counts.values()))
+            for token, frequency in counts.items():
+                self.postings[token].append((index, frequency))
+        self.average_length = (sum(self.lengths) / len(self.lengths)) if self.lengths else 0.0
+
+    def idf(self, token):
+        n = len(self.postings.get(token, ()))
+        return math.log(1 + (len(self.chunks) - n + 0.5) / (n + 0.5))
+
+    def search(self, query, k=5):
+        """Return up to `k` (score, chunk index) pairs, best first. Only matching chunks are scored."""
+        scores = defaultdict(float)
+        for token in set(tokenize(query)):
+            idf = self.idf(token)
+            for index, frequency in self.postings.get(token, ()):
+                norm = self.k1 * (1 - self.b + self.b * self.lengths[index] / (self.average_length or 1))
+                scores[index] += idf * frequency * (self.k1 + 1) / (frequency + norm)
+        return heapq.nlargest(k, ((score, index) for index, score in scores.items()))
+
+
+class ContextSelector:
+    """
+    Picks the text sent with a skill's prompts. Short texts are returned whole;
+    long ones are replaced by their top-k BM25 chunks for the skill, in
+    document order (or the opening chunks when nothing matches).
+    """
+
+    def __init__(self, text, top_k=None, chunk_chars=None, min_chars=None):
+        self.text = text
+        self.top_k = top_k or getattr(settings, 'RETRIEVAL_TOP_K', 6)
+        min_chars = min_chars or getattr(settings, 'RETRIEVAL_MIN_CHARS', 12000)
+        self.index = None
+        if len(text) > min_chars:
+            chunk_chars = chunk_chars or getattr(settings, 'RETRIEVAL_CHUNK_CHARS', 1500)
+            self.index = BM25Index(chunk_text(text, chunk_chars=chunk_chars, overlap_chars=chunk_chars // 8))
+
+    def context_for(self, query):
+        if self.index is None:
+            return self.text
+        indexes = sorted(index for _, index in self.index.search(query, self.top_k))
+        if not indexes:
+            indexes = range(min(self.top_k, len(self.index.chunks)))
+        return "\n\n".join(self.index.chunks[index] for index in indexes)
@@ -0,0 +1,321 @@
+import json
+import re
+import tempfile
+import threading
+import time
+from types import SimpleNamespace
+from unittest import mock, skipUnless
+
+from django.core.cache import caches
+from django.db import connection
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from users.models import User
+
+from . import generation, grading, llm_cache, paper
+from .dashboard_cache import fragment_key
+from .dedup import NearDuplicateIndex
+from .jobs import claim_next_job, enqueue_generation
+from .models import Exam, StudentExamAttempt
+from .persistence import save_generated_questions
+
+LEVELS = ['Easy', 'Medium', 'Hard']
+
+# In-memory caches, so tests don't write to the file cache or a shared server
+TEST_CACHES = {
+    'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'tests-default'},
+    'sessions': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'tests-sessions'},
+}
+
+
+def make_exam(teacher, questions_per_level, title='Exam', topics=('Python',)):
+    """An exam with `questions_per_level` generated questions per topic and level; choice 'a' is correct."""
+    exam = Exam.objects.create(teacher=teacher, title=title, skills=list(topics))
+    save_generated_questions(exam, [
+        (topic, level, {
+            'text': f'{topic} {level} question {i}?',
+            'answer_choices': [{'text': option, 'is_correct': option == 'a'} for option in 'abcd'],
+        })
+        for topic in topics for level in LEVELS for i in range(questions_per_level)
+    ])
+    return exam
+
+
+@override_settings(CACHES=TEST_CACHES)
+class ExamTestCase(TestCase):
+    """
+    Starts every test with empty caches: ids restart after each test's
+    rollback, so papers, answer keys and dashboard fragments cached by an
+    earlier test would otherwise match the new rows.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.teacher = User.objects.create_user('teacher', password='pw', is_teacher=True)
+        cls.student = User.objects.create_user('student', password='pw', is_student=True)
+
+    def setUp(self):
+        for alias in TEST_CACHES:
+            caches[alias].clear()
+        paper._local_papers.clear()
+        grading._answer_keys.clear()
+
+
+class StudentExamResponsesQueryTests(ExamTestCase):
+    """The teacher's report of a student's answers must not run queries per question."""
+
+    QUERIES = 6  # user, student, exam, responses with questions, their choices, the attempt
+
+    def take_exam(self, exam):
+        """Answer every question of `exam` correctly through the API and finalize it."""
+        self.client.force_login(self.student)
+        api = f'/api/v1/exams/{exam.id}'
+        exam_paper = self.client.get(f'{api}/paper/').json()
+        correct = {
+            question.id: question.answer_choices.get(is_correct=True).id for question in exam.questions.all()
+        }
+        for level in ('easy', 'medium', 'hard'):
+            answers = [[row[0], correct[row[0]]] for row in exam_paper['levels'][level]]
+            self.client.post(f'{api}/answers/', json.dumps({'answers': answers}), content_type='application/json')
+        self.assertEqual(self.client.post(f'{api}/finalize/').json()['score'], 100.0)
+
+    def test_query_count_does_not_grow_with_exam_length(self):
+        for questions_per_level in (3, 15):
+            with self.subTest(questions=questions_per_level * len(LEVELS)):
+                exam = make_exam(self.teacher, questions_per_level, title=f'Exam {questions_per_level}')
+                self.take_exam(exam)
+                self.client.force_login(self.teacher)
+                url = reverse('student_exam_responses', args=[self.student.id, exam.id])
+                with self.assertNumQueries(self.QUERIES):
+                    response = self.client.get(url)
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(len(response.context['responses']), questions_per_level * len(LEVELS))
+
+
+class StudentDashboardCacheTests(ExamTestCase):
+    """Cached exam lists must change as soon as the catalog or the student's attempts do, in any process."""
+
+    def dashboard(self, **params):
+        return self.client.get(reverse('student_dashboard'), params).content.decode()
+
+    def test_fragment_follows_database_changes(self):
+        self.client.force_login(self.student)
+        first = Exam.objects.create(teacher=self.teacher, title='First exam')
+        self.assertIn('First exam', self.dashboard())
+
+        # Created, attempted and deleted straight through the ORM, as another process would
+        second = Exam.objects.create(teacher=self.teacher, title='Second exam')
+        self.assertIn('Second exam', self.dashboard())
+
+        StudentExamAttempt.objects.create(student=self.student, exam=first, score=80, end_time=timezone.now())
+        self.assertIn('Already Attempted', self.dashboard())
+
+        StudentExamAttempt.objects.filter(student=self.student).delete()
+        second.delete()
+        html = self.dashboard()
+        self.assertNotIn('Already Attempted', html)
+        self.assertNotIn('Second exam', html)
+
+    def test_invalid_cursor_is_the_first_page(self):
+        Exam.objects.create(teacher=self.teacher, title='Only exam')
+        self.client.force_login(self.student)
+        self.assertEqual(fragment_key(self.student.id, 'x' * 500), fragment_key(self.student.id, ''))
+        self.assertIn('Only exam', self.dashboard(after='not-a-cursor'))
+
+
+@skipUnless(connection.vendor == 'sqlite', "Query plans are checked with SQLite's EXPLAIN QUERY PLAN")
+class QueryPlanTests(ExamTestCase):
+    """
+    The hot paths must not read whole tables. Each test runs a real view or
+    helper, then EXPLAINs every SELECT it executed. A SCAN (as opposed to a
+    SEARCH on an index) fails, and so does a temporary B-tree sort in
+    paginated lists, where the index must already yield the page order.
+    Run these after changing models, indexes or the queries of these views.
+    """
+
+    FULL_SCAN_RE = re.compile(r'\bSCAN (?!CONSTANT ROW)(\w+)')
+    TEMP_SORT_RE = re.compile(r'USE TEMP B-TREE FOR (?:ORDER BY|RIGHT PART OF ORDER BY)')
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.exam = make_exam(cls.teacher, 3, title='Hot exam', topics=('Python', 'SQL'))
+        cls.other_exam = make_exam(cls.teacher, 3, title='Other exam')
+        for i in range(3):
+            student = User.objects.create_user(f'student{i}', password='pw', is_student=True)
+            StudentExamAttempt.objects.create(student=student, exam=cls.other_exam, score=50, end_time=timezone.now())
+
+    def assertIndexed(self, run, sorted_pages=False, allow_scans=()):
+        """Run `run()` and check the plan of every SELECT it executed."""
+        with CaptureQueriesContext(connection) as queries:
+            run()
+        selects = [query['sql'] for query in queries.captured_queries if query['sql'].lstrip().startswith('SELECT')]
+        self.assertTrue(selects)
+        for sql in selects:
+            with connection.cursor() as cursor:
+                cursor.execute('EXPLAIN QUERY PLAN ' + sql)
+                plan = '\n'.join(row[-1] for row in cursor.fetchall())
+            scanned = [table for table in self.FULL_SCAN_RE.findall(plan) if table not in allow_scans]
+            self.assertFalse(scanned, f"Full scan of {', '.join(scanned)}:\n{sql}\n{plan}")
+            if sorted_pages:
+                self.assertNotRegex(plan, self.TEMP_SORT_RE, f"Page sorted in a temporary B-tree:\n{sql}\n{plan}")
+
+    def test_taking_an_exam(self):
+        self.client.force_login(self.student)
+        api = f'/api/v1/exams/{self.exam.id}'
+        self.assertIndexed(lambda: self.client.get(reverse('take_exam', args=[self.exam.id])))  # builds the paper
+        exam_paper = self.client.get(f'{api}/paper/').json()
+        answers = [[row[0], row[2][0][0]] for row in exam_paper['levels']['easy']]
+        self.assertIndexed(lambda: self.client.post(
+            f'{api}/answers/', json.dumps({'answers': answers}), content_type='application/json'))
+        self.assertIndexed(lambda: self.client.post(f'{api}/finalize/'))
+
+    def test_reports(self):
+        self.client.force_login(self.teacher)
+        student = StudentExamAttempt.objects.filter(exam=self.other_exam).first().student
+        self.assertIndexed(lambda: self.client.get(
+            reverse('student_exam_responses', args=[student.id, self.other_exam.id])))
+        self.assertIndexed(lambda: self.client.get(
+            reverse('student_performance_by_teacher', args=[student.id])))
+
+    def test_teacher_dashboard_pages(self):
+        self.client.force_login(self.teacher)
+        cursor = StudentExamAttempt.objects.order_by('-id').values_list('id', flat=True)[1]
+        for url in (
+            reverse('teacher_dashboard'),
+            reverse('teacher_dashboard') + f'?exam={self.other_exam.id}',
+            reverse('teacher_dashboard_exams') + f'?after={self.other_exam.id}',
+            reverse('teacher_dashboard_attempts') + f'?after={cursor}',
+            reverse('teacher_dashboard_attempts') + f'?after={cursor}&exam={self.other_exam.id}',
+        ):
+            with self.subTest(url=url):
+                self.assertIndexed(lambda: self.client.get(url), sorted_pages=True)
+
+    def test_student_dashboard_pages(self):
+        self.client.force_login(self.student)
+        # Every exam is listed to students, so the first page walks the exam table in primary key order
+        for params in ('', f'?after={self.other_exam.id}'):
+            with self.subTest(params=params):
+                self.assertIndexed(lambda: self.client.get(reverse('student_dashboard') + params),
+                                   sorted_pages=True, allow_scans=('exams_exam',))
+
+    def test_generation_queue(self):
+        enqueue_generation(self.exam, self.teacher, ['Python'], 4, 3)
+        self.assertIndexed(lambda: claim_next_job('test-worker'))
+
+
+class NearDuplicateIndexTests(SimpleTestCase):
+    """Rewordings are duplicates; questions in other scripts, or that differ in their answer, are not."""
+
+    def assertAccepted(self, *questions, rejected=()):
+        index = NearDuplicateIndex()
+        for text, answer in questions:
+            self.assertTrue(index.add(text, answer), text)
+        for text, answer in rejected:
+            self.assertFalse(index.add(text, answer), text)
+
+    def test_rewordings_are_duplicates(self):
+        self.assertAccepted(
+            ("Which of these best describes a Python list?", "An ordered mutable sequence"),
+            ("Which method adds an item to the end of a list?", "append()"),
+            rejected=[
+                ("What best describes a list in Python?", "An ordered mutable sequence"),
+                ("What method appends an item at the end of a Python list?", "append()"),
+            ])
+
+    def test_questions_with_different_answers_are_kept(self):
+        self.assertAccepted(
+            ("What is the time complexity of binary search?", "O(log n)"),
+            ("What is the time complexity of linear search?", "O(n)"),
+            ("What is the output of print(2**3)?", "8"),
+            ("What is the output of print(3**2)?", "9"),
+        )
+
+    def test_non_latin_questions(self):
+        self.assertAccepted(
+            ("Что такое список в Python?", "Упорядоченная коллекция"),
+            ("Что такое кортеж в Python?", "Неизменяемая коллекция"),
+            ("पायथन में सूची क्या है?", "क्रमबद्ध संग्रह"),
+            ("Pythonのリストとは何ですか？", "順序付きコレクション"),
+            ("Pythonのタプルとは何ですか？", "変更不可のコレクション"),
+            rejected=[
+                ("Что представляет собой список в Python?", "Упорядоченная коллекция"),
+                ("Pythonのリストとは何ですか？", "順序付きコレクション"),
+            ])
+
+    def test_questions_without_words_are_compared_by_text(self):
+        self.assertAccepted(("∑ ≠ ∏ ?", "≠"), ("∏ ≠ ∑ ?", "≠"), rejected=[("∑  ≠ ∏ ?", "≠")])
+
+
+class FakeChunk:
+    """A streamed completion chunk shaped like the g4f client's."""
+
+    def __init__(self, content):
+        self.choices = [SimpleNamespace(delta=SimpleNamespace(content=content))]
+
+
+class GenerateManyTests(SimpleTestCase):
+    """A consumer that stops reading (e.g. a worker that lost its job) must not leave queued requests running."""
+
+    def setUp(self):
+        self.calls = 0
+        self.release = threading.Event()
+
+    def complete(self, model, messages, **kwargs):
+        """The first call answers at once; later ones wait until the test releases them."""
+        self.calls += 1
+        if self.calls > 1:
+            self.release.wait(timeout=1)
+        return iter([FakeChunk("Question 1: Why?\na. Because\nb. No\nCorrect Answer: a\n")])
+
+    def test_closing_the_stream_cancels_queued_requests(self):
+        requests = [('Rules', ['Easy'], 'Some text.', 1, attempt) for attempt in range(4)]
+        with mock.patch.object(generation.client.chat.completions, 'create', self.complete):
+            stream = generation.generate_many(requests, 2, max_in_flight=1, use_cache=False)
+            next(stream)
+            stream.close()
+            self.release.set()
+            time.sleep(0.3)
+        # The first request, and possibly the one already in flight; never the queued ones
+        self.assertLessEqual(self.calls, 2)
+
+
+class GenerationDuplicateTests(ExamTestCase):
+    """Regenerating exams from the same text must not replay cached questions the duplicate index rejects."""
+
+    def setUp(self):
+        super().setUp()
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        patcher = mock.patch.object(llm_cache, '_cache', llm_cache.LLMCache(llm_cache.DiskCache(directory.name)))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.serial = 0
+
+    def complete(self, model, messages, **kwargs):
+        """Every call writes questions, in words no earlier call used."""
+        def questions():
+            text = ""
+            for i in (1, 2):
+                self.serial += 1
+                n = self.serial
+                text += f"Question {i}: Why is w{n}a w{n}b w{n}c?\na. x{n}\nb. y{n}\nCorrect Answer: a\n"
+            return text
+
+        if 'EACH of the three' in messages[0]['content']:
+            content = "".join(f"Level: {level}\n" + questions() for level in LEVELS)
+        else:
+            content = questions()
+        return iter([FakeChunk(content)])
+
+    def test_repeated_regeneration_fills_every_exam(self):
+        with mock.patch.object(generation.client.chat.completions, 'create', self.complete):
+            for run in range(5):
+                with self.subTest(run=run):
+                    exam = Exam.objects.create(teacher=self.teacher, title=f'Run {run}')
+                    controller = generation.generate_exam_questions(exam, 'The same source text.', ['Rules'], 2, 2)
+                    self.assertEqual(controller.shortfalls(), {})
+                    self.assertEqual(exam.questions.count(), 6)
@@ -3,6 +3,8 @@ from . import views
 
 urlpatterns = [
     path('teacher/dashboard/', views.teacher_dashboard_view, name='teacher_dashboard'),
+    path('teacher/dashboard/exams/', views.teacher_dashboard_exams, name='teacher_dashboard_exams'),
+    path('teacher/dashboard/attempts/', views.teacher_dashboard_attempts, name='teacher_dashboard_attempts'),
     path('teacher/pdf/upload/', views.upload_pdf, name='upload_pdf'), # Keep PDF upload URL for now
     path('teacher/exam/create/', views.create_exam, name='create_exam'),
     path('teacher/pdf/delete_all/', views.delete_all_pdfs, name='delete_all_pdfs'), # New URL for delete all PDFs
@@ -17,5 +19,6 @@ urlpatterns = [
     path('teacher/student_responses/<int:student_id>/<int:exam_id>/', views.student_exam_responses, name='student_exam_responses'),
     path('teacher/question/<int:question_id>/edit/', views.edit_question, name='edit_question'),
     path('teacher/generate_skills/', views.generate_skills_from_pdf, name='generate_skills_from_pdf'), # New URL for generating skills
+    path('teacher/generation_job/<int:job_id>/status/', views.generation_job_status, name='generation_job_status'),
     path('teacher/feedback/<int:student_id>/<int:exam_id>/', views.add_edit_feedback, name='add_edit_feedback'),
 ]
\ No newline at end of file
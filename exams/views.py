@@ -1,181 +1,29 @@
-from django.utils import timezone
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
 from .forms import PDFUploadForm, ExamCreationForm, AnswerChoiceFormSet, FeedbackForm
-from .models import PDFDocument, Exam, Question, StudentExamAttempt, AnswerChoice
-from PyPDF2 import PdfReader
-from g4f.client import Client
+from .models import PDFDocument, Exam, Question, StudentExamAttempt, AnswerChoice, GenerationJob, ExamSession
+from .generation import extract_skills_from_text, generate_exam_questions
+from .pdf_text import get_pdf_text
+from .jobs import enqueue_generation
+from .paper import get_paper, invalidate_paper
+from .attempts import advance, current_section, questions_for, submit_section, unavailable_reason
+from .grading import answer_key, key_for_paper
+from .pagination import keyset_page
+from .dashboard_cache import get_fragment
 from django.contrib import messages # for user feedback, one-time notifications to users
 from .models import User 
 from .models import StudentResponse  # Import the new model
-import re # Import re for regular expressions
 from django.forms import modelform_factory # dynamically creates ModelForm classes from Django models
-from collections import defaultdict
+from django.db.models import Avg, Count, Exists, OuterRef, Prefetch, Q
+from django.template.loader import render_to_string
+from django.core.paginator import Paginator
 from django.views.decorators.http import require_POST # handle form submissions, data creation
 from django.http import JsonResponse
+from django.urls import reverse
+from django.conf import settings
 from django.views.decorators.csrf import csrf_exempt # Django will not check for a CSRF protection token on requests to that view
 
 
-client = Client()
-
-def extract_text_from_pdf(pdf_file):
-    text = ""
-    pdf_reader = PdfReader(pdf_file)
-    for page in pdf_reader.pages:
-        text += page.extract_text()
-    return text
-
-def extract_skills_from_text(text, num_skills=10):
-    """Extract skills using AI-based extraction with GPT."""
-    try:
-        prompt_text = f"""Analyze the following text and identify up to {num_skills} Main topics mentioned in the text.
-Provide ONLY the skills as a comma-separated list, with no additional text or formatting.
-        
-
-        Text:
-        {text}
-
-        Example Output: Sub topic 1, Sub topic 2, Sub topic 3
-        """
-
-        response = client.chat.completions.create(
-            model="gpt-4o-mini", 
-            messages=[{"role": "user", "content": prompt_text}],
-            web_search=True
-        )
-        gpt_response = response.choices[0].message.content
-
-        # Split the response by comma and strip whitespace
-        skills = [skill.strip() for skill in gpt_response.split(',') if skill.strip()]
-        return skills[:num_skills] # Return up to num_skills
-
-    except Exception as e:
-        print(f"GPT Sub topic Extraction Error: {e}")
-        
-def generate_questions_with_gpt(text, num_questions=3, num_options=4, topic_prompt=""):
-    try:
-        # Create the prompt based on whether topic_prompt is provided.
-        if topic_prompt:
-            prompt_text = f"""Generate {num_questions} multiple choice questions from the following text:
-
-{text}
-{topic_prompt}
-**Formatting Requirements:**
-
-1. Ensure each question is unique and does not repeat concepts.
-2. Provide {num_options} distinct answer options per question. 
-3. Mark only ONE correct answer clearly.
-4. Include real-world examples where appropriate for diversity.
-
-For each question, please follow this structure EXACTLY:
-
-1. **Question Text:** Start with the question number (e.g., "Question 1:") followed by the question itself on a single line. Please ensure the question is clear and concise and relevant to the topic '{topic_prompt}'.
-
-2. **Answer Choices:** Provide exactly {num_options} answer choices. Use lowercase letters (a, b, c, etc.) followed by a period and a space (e.g., {" ".join([f'"{chr(97+i)}. Choice text"' for i in range(num_options)])}). Ensure each choice is unique and plausible, but only one is definitively correct.
-
-3. **Correct Answer:** On a new line after the choices, clearly indicate the correct answer by stating "Correct Answer: " followed by the letter corresponding to the correct choice (e.g., "Correct Answer: {"a" if num_options == 2 else "b"}").
-
-**Example of Desired Output Format:**
-
-Question 1: What is the capital of France?
-a. Berlin
-b. Paris
-c. Rome
-d. London
-......(As many options as mentioned ie {num_options})
-Correct Answer: b
-
-Question 2: ...
-"""
-        else:
-            prompt_text = f"""Generate {num_questions} multiple choice questions from the following text:
-
-{text}
-
-**Formatting Requirements:**
-
-For each question, please follow this structure EXACTLY:
-
-1. **Question Text:** Start with the question number (e.g., "Question 1:") followed by the question itself on a single line. Please ensure the question is clear and concise.
-
-2. **Answer Choices:** Provide {num_options} answer choices, each on a new line, labeled with lowercase letters followed by a period (e.g., "a. Choice text", "b. Another choice"). Ensure each choice is a plausible answer but only one should be definitively correct.
-
-3. **Correct Answer:** On a new line after the choices, clearly indicate the correct answer by stating "Correct Answer: " followed by the letter corresponding to the correct choice (e.g., "Correct Answer: b").
-
-**Example of Desired Output Format:**
-
-Question 1: What is the capital of France?
-a. Berlin
-b. Paris
-c. Rome
-d. London
-......(As many options as mentioned ie {num_options})
-Correct Answer: b
-
-Question 2: ...
-"""
-
-        # Call the GPT model.
-        response = client.chat.completions.create(
-            model="gpt-4o",
-            messages=[{"role": "user", "content": prompt_text}],
-            web_search=False
-        )
-        gpt_response = response.choices[0].message.content
-
-        # Use regex to split output by lines that begin with "Question <number>:"
-        # Improved splitting with better handling of empty questions
-        question_blocks = [block.strip() for block in re.split(r'(?=Question\s+\d+:)', gpt_response.strip()) if block.strip()]
-
-        questions_data = []
-
-        for block in question_blocks:
-            lines = block.splitlines()
-
-            # Ensure the block starts with a valid question
-            if not lines or not lines[0].startswith("Question"):
-                continue
-
-            # Extract the question text safely
-            question_line = lines[0].strip()
-            question_text = re.sub(r'^Question\s+\d+:\s*', '', question_line).strip()
-
-            # Ensure valid question text is present
-            if not question_text:
-                continue
-
-            answer_choices = []
-            correct_answer_index = None
-
-            # Process answer choices and find the correct one
-            for line in lines[1:]:
-                line = line.strip()
-
-                if line.lower().startswith('correct answer:'):
-                    correct_letter = line.split(':', 1)[-1].strip().lower()
-                    correct_answer_index = ord(correct_letter) - ord('a') # Convert letter to index
-                else:
-                    match = re.match(r'^([a-z])\.\s*(.+)$', line)
-                    if match:
-                        choice_text = match.group(2).strip()
-                        answer_choices.append({'text': choice_text, 'is_correct': False})
-
-            # Validate and mark the correct answer
-            if correct_answer_index is not None and 0 <= correct_answer_index < len(answer_choices):
-                answer_choices[correct_answer_index]['is_correct'] = True
-
-            # Ensure the question has valid answer choices
-            if question_text and len(answer_choices) == num_options:
-                questions_data.append({'text': question_text, 'answer_choices': answer_choices})
-
-        # Ensure we only return the required number of questions
-        questions_data = questions_data[:num_questions]
-        return questions_data
-
-    except Exception as e:
-        print(f"GPT Error: {e}")
-        return []
-
 @login_required 
 def student_performance_by_teacher(request, student_id):
     """
@@ -189,97 +37,62 @@ def student_performance_by_teacher(request, student_id):
          messages.error(request, "You are not authorized to view this performance history.")
          return redirect('student_dashboard') if request.user.is_student else redirect('home')
 
-    # Get all completed attempts for the student
+    # Completed attempts, a page at a time; the per-level counters stored on each attempt
+    # replace re-grading its responses
     attempts = StudentExamAttempt.objects.filter(
         student=student,
-        score__isnull=False
-    ).select_related('exam', 'exam__teacher').order_by('exam__teacher__username', 'start_time')
-
-    # Get all relevant responses for these attempts in one query
-    attempt_exam_ids = [a.exam.id for a in attempts if a.exam]
-    all_responses = StudentResponse.objects.filter(
-        student=student,
-        exam_id__in=attempt_exam_ids
-    ).select_related('question', 'selected_choice')
-
-    # Group responses by exam_id for efficient lookup
-    responses_by_exam = defaultdict(list)
-    for resp in all_responses:
-        responses_by_exam[resp.exam.id].append(resp)
+        score__isnull=False,
+        exam__teacher__isnull=False
+    ).select_related('exam', 'exam__teacher').order_by('exam__teacher__username', 'start_time', 'id')
+    page = Paginator(attempts, getattr(settings, 'PERFORMANCE_ATTEMPTS_PER_PAGE', 20)).get_page(request.GET.get('page'))
+
+    # Average score and attempt count per teacher on this page, aggregated in the database
+    teacher_stats = {
+        row['exam__teacher']: row
+        for row in StudentExamAttempt.objects.filter(
+            student=student,
+            score__isnull=False,
+            exam__teacher__in={attempt.exam.teacher_id for attempt in page}
+        ).values('exam__teacher').annotate(average_score=Avg('score'), count=Count('id'))
+    }
 
     # Group detailed attempts by teacher
-    performance_by_teacher = defaultdict(lambda: {'attempts_details': [], 'total_score': 0.0, 'count': 0, 'average_score': 0.0}) # 
-
-    for attempt in attempts:
-        if not (attempt.exam and attempt.exam.teacher):
-            continue # Skip if exam or teacher is missing
-
+    performance_by_teacher = {}
+    for attempt in page:
         teacher = attempt.exam.teacher
-        exam_responses = responses_by_exam.get(attempt.exam.id, [])
-
-        # Calculate detailed stats for this attempt
-        total_marks = 0
-        easy_marks, medium_marks, hard_marks = 0, 0, 0
-        easy_total, medium_total, hard_total = 0, 0, 0
-
-        for response in exam_responses:
-            # Ensure response has a question and selected choice before processing
-            if not response.question or not response.selected_choice:
-                continue
-
-            difficulty = response.question.difficulty
-            is_correct = response.selected_choice.is_correct
-
-            if difficulty.lower() == 'easy':
-                easy_total += 1
-                if is_correct: easy_marks += 1
-            elif difficulty.lower() == 'medium':
-                medium_total += 1
-                if is_correct: medium_marks += 1
-            elif difficulty.lower() == 'hard':
-                hard_total += 1
-                if is_correct: hard_marks += 1
-
-            if is_correct:
-                total_marks += 1 # This might differ from attempt.score if scoring logic changes
-
-        overall_total = easy_total + medium_total + hard_total
+        if teacher not in performance_by_teacher:
+            stats = teacher_stats.get(teacher.id, {'average_score': 0.0, 'count': 0})
+            performance_by_teacher[teacher] = {
+                'attempts_details': [],
+                'count': stats['count'],
+                'average_score': round(stats['average_score'] or 0.0, 2),
+            }
 
         # Determine level classification (using the same 80% threshold logic)
         level = "Needs Improvement"  # Default level
         # Check division by zero
-        if hard_total > 0 and (hard_marks / hard_total) >= 0.8: level = "Advanced"
-        elif medium_total > 0 and (medium_marks / medium_total) >= 0.8: level = "Intermediate"
-        elif easy_total > 0 and (easy_marks / easy_total) >= 0.8: level = "Beginner"
+        if attempt.hard_total > 0 and (attempt.hard_score / attempt.hard_total) >= 0.8: level = "Advanced"
+        elif attempt.medium_total > 0 and (attempt.medium_score / attempt.medium_total) >= 0.8: level = "Intermediate"
+        elif attempt.easy_total > 0 and (attempt.easy_score / attempt.easy_total) >= 0.8: level = "Beginner"
 
         # Store attempt and its details
-        attempt_details = {
+        performance_by_teacher[teacher]['attempts_details'].append({
             'attempt': attempt,
-            'total_marks': total_marks, # Correct answers count
-            'overall_total': overall_total, # Total questions count
-            'easy_marks': easy_marks,
-            'easy_total': easy_total,
-            'medium_marks': medium_marks,
-            'medium_total': medium_total,
-            'hard_marks': hard_marks,
-            'hard_total': hard_total,
+            'total_marks': attempt.easy_score + attempt.medium_score + attempt.hard_score, # Correct answers count
+            'overall_total': attempt.easy_total + attempt.medium_total + attempt.hard_total, # Total questions count
+            'easy_marks': attempt.easy_score,
+            'easy_total': attempt.easy_total,
+            'medium_marks': attempt.medium_score,
+            'medium_total': attempt.medium_total,
+            'hard_marks': attempt.hard_score,
+            'hard_total': attempt.hard_total,
             'level': level,
-        }
-        performance_by_teacher[teacher]['attempts_details'].append(attempt_details)
-
-        # Update teacher's average score calculation
-        if attempt.score is not None:
-            performance_by_teacher[teacher]['total_score'] += attempt.score
-            performance_by_teacher[teacher]['count'] += 1
-
-    # Calculate average score for each teacher
-    for teacher, data in performance_by_teacher.items():
-        if data['count'] > 0:
-            data['average_score'] = round(data['total_score'] / data['count'], 2)
+        })
 
     context = {
         'student': student,
-        'performance_data': dict(performance_by_teacher),
+        'performance_data': performance_by_teacher,
+        'page_obj': page,
     }
     return render(request, 'exams/student_performance_by_teacher.html', context)
 
@@ -287,48 +100,39 @@ def student_performance_by_teacher(request, student_id):
 def student_exam_responses(request, student_id, exam_id):
     student = get_object_or_404(User, id=student_id, is_student=True)
     exam = get_object_or_404(Exam, id=exam_id)
-    responses = StudentResponse.objects.filter(student=student, exam=exam).select_related('question', 'selected_choice')
-
-    # Initialize topic-wise tracking and overall totals
-    topic_data = {}
-    total_marks_obtained = 0
-    total_possible_marks = 0
+    # All choices of the answered questions come in one prefetch query instead of one query per question
+    responses = StudentResponse.objects.filter(student=student, exam=exam).select_related('question').prefetch_related(
+        Prefetch('question__answer_choices', queryset=AnswerChoice.objects.order_by('id'))
+    ).order_by('id')
+
+    # Everything the template shows, precomputed so rendering runs no queries
+    response_rows = [
+        {
+            'text': response.question.text,
+            'choices': [
+                {'text': choice.text, 'selected': choice.id == response.selected_choice_id, 'is_correct': choice.is_correct}
+                for choice in response.question.answer_choices.all()
+            ],
+        }
+        for response in responses
+    ]
 
     # Helper function to check if the student passed (80% threshold)
     def is_passed(marks, total):
         return total > 0 and (marks / total) >= 0.8
 
-    # Calculate correct responses and totals by topic and difficulty
-    for response in responses:
-        topic = response.question.topic
-        difficulty = response.question.difficulty
-
-        if topic not in topic_data:
-            topic_data[topic] = {
-                'easy_marks': 0, 'easy_total': 0,
-                'medium_marks': 0, 'medium_total': 0,
-                'hard_marks': 0, 'hard_total': 0
-            }
+    # Correct responses and totals by topic and difficulty: stored on the attempt at submit
+    # time, or graded against the exam's answer key for attempts without a stored breakdown
+    attempt = StudentExamAttempt.objects.filter(student=student, exam=exam).only('topic_stats').first()
+    if attempt and attempt.topic_stats:
+        topic_data = attempt.topic_stats
+    else:
+        topic_data = answer_key(exam).grade([(response.question_id, response.selected_choice_id) for response in responses]).topics
+    total_marks_obtained = sum(data['easy_marks'] + data['medium_marks'] + data['hard_marks'] for data in topic_data.values())
+    total_possible_marks = sum(data['easy_total'] + data['medium_total'] + data['hard_total'] for data in topic_data.values())
 
-        # Update totals and correct answers
-        if difficulty.lower() == 'easy':
-            topic_data[topic]['easy_total'] += 1
-            if response.selected_choice and response.selected_choice.is_correct:
-                topic_data[topic]['easy_marks'] += 1
-        elif difficulty.lower() == 'medium':
-            topic_data[topic]['medium_total'] += 1
-            if response.selected_choice and response.selected_choice.is_correct:
-                topic_data[topic]['medium_marks'] += 1
-        elif difficulty.lower() == 'hard':
-            topic_data[topic]['hard_total'] += 1
-            if response.selected_choice and response.selected_choice.is_correct:
-                topic_data[topic]['hard_marks'] += 1
-
-    # Determine student level for each topic and calculate total marks
+    # Determine student level for each topic
     for topic, data in topic_data.items():
-        total_marks_obtained += data['easy_marks'] + data['medium_marks'] + data['hard_marks']
-        total_possible_marks += data['easy_total'] + data['medium_total'] + data['hard_total']
-
         # Determine the student's level based on progression
         if not is_passed(data['easy_marks'], data['easy_total']):
             data['level'] = "Needs Improvement"
@@ -344,7 +148,7 @@ def student_exam_responses(request, student_id, exam_id):
     return render(request, 'users/student_exam_responses.html', {
         'student': student,
         'exam': exam,
-        'responses': responses,
+        'responses': response_rows,
         'topic_data': topic_data,  # Pass topic-wise data to the template
         'total_marks_obtained': total_marks_obtained,  # Total marks obtained
         'total_possible_marks': total_possible_marks,  # Total marks possible
@@ -356,15 +160,6 @@ def teacher_dashboard_view(request):
     if not request.user.is_teacher:
         return redirect('home')
 
-    exams = Exam.objects.filter(teacher=request.user)
-    
-    # Fetch StudentExamAttempt objects for completed exams by students
-    student_attempts = StudentExamAttempt.objects.filter(
-        exam__teacher=request.user, # Only attempts for exams created by the current teacher
-        score__isnull=False, # Only completed attempts
-        student__is_student=True # Explicitly filter for students
-    ).select_related('student', 'exam').order_by('student__username', 'exam__title')
-
     if request.method == 'POST':
         exam_form = ExamCreationForm(request.POST, request.FILES)
         
@@ -378,55 +173,30 @@ def teacher_dashboard_view(request):
             skills_input = exam_form.cleaned_data['skills']
             skills = [skill.strip() for skill in skills_input.split(',') if skill.strip()]
             exam.skills = skills
+
+            # Generation runs in the background workers (exams/jobs.py); the uploaded
+            # PDF is kept on the exam so any worker can read it from storage.
+            if pdf_file_uploaded:
+                exam.pdf_document = pdf_file_uploaded
             exam.save()
 
-            # Generate questions
-            num_options = exam_form.cleaned_data['num_options']
-            num_questions_per_level = exam_form.cleaned_data['num_questions_per_level']
-
-            # Generate questions for each skill and level
-            text = extract_text_from_pdf(pdf_file_uploaded) if pdf_file_uploaded else topic_prompt
-            unique_questions = set()
-
-            for skill in skills:
-                for level in ["Easy", "Medium", "Hard"]:
-                    #print(f"🔍 Generating questions for {skill} - {level}")
-                    
-                    # Keep generating until we have enough unique questions
-                    while len([q for q in unique_questions if q[1] == level and q[2] == skill]) < num_questions_per_level:
-                        generated_questions = generate_questions_with_gpt(
-                            text=text,
-                            num_questions=num_questions_per_level,
-                            num_options=num_options,
-                            topic_prompt=f"{skill} - {level}"
-                        )
-
-                        for q_data in generated_questions:
-                            # Ensure question uniqueness across all skills and levels
-                            question_key = (q_data['text'], level, skill)
-                            
-                            if question_key not in unique_questions:
-                                unique_questions.add(question_key)
-
-                                # Save the question with difficulty and skill reference
-                                question = Question.objects.create(
-                                    exam=exam,
-                                    text=q_data['text'],
-                                    difficulty=level,
-                                    topic=skill 
-                                )
-
-                                for choice_data in q_data.get('answer_choices', []):
-                                    AnswerChoice.objects.create(
-                                        question=question,
-                                        text=choice_data['text'],
-                                        is_correct=choice_data['is_correct']
-                                    )
-
-                                #print(f"✅ Saved Question: '{question.text}' (Difficulty: {question.difficulty})")
-
-
-            messages.success(request, "Exam created with questions!")
+            job = enqueue_generation(
+                exam,
+                request.user,
+                skills=skills,
+                num_options=exam_form.cleaned_data['num_options'],
+                num_questions_per_level=exam_form.cleaned_data['num_questions_per_level'],
+                topic_prompt=topic_prompt,
+            )
+
+            if request.headers.get('x-requested-with') == 'XMLHttpRequest':
+                return JsonResponse({
+                    'job_id': job.id,
+                    'status': job.status,
+                    'status_url': reverse('generation_job_status', args=[job.id]),
+                }, status=202)
+
+            messages.success(request, f"Exam created! Questions are being generated in the background (job #{job.id}).")
             return redirect('teacher_dashboard')
         else:
             print("❌ Form errors:", exam_form.errors)
@@ -434,10 +204,107 @@ def teacher_dashboard_view(request):
     else:  # GET request
         exam_form = ExamCreationForm()
 
+    generation_jobs = GenerationJob.objects.filter(teacher=request.user).select_related('exam')[:10]
+
+    # Only the first page of exams and attempts is rendered; the rest is loaded on demand
+    # from teacher_dashboard_exams / teacher_dashboard_attempts
+    per_page = getattr(settings, 'DASHBOARD_PAGE_SIZE', 25)
+    exams, exams_next = keyset_page(teacher_exams(request), per_page=per_page)
+    student_attempts, attempts_next = keyset_page(teacher_attempts(request), per_page=per_page)
+
     return render(request, 'users/teacher_dashboard.html', {
         'exams': exams,
+        'exams_next': exams_next,
         'student_attempts': student_attempts, # Pass student_attempts instead of student_responses_list
+        'attempts_next': attempts_next,
+        'search': request.GET.get('q', '').strip(),
+        'exam_filter': teacher_exam_filter(request),
         'exam_creation_form': exam_form,
+        'generation_jobs': generation_jobs,
+    })
+
+
+def teacher_exams(request):
+    """The teacher's exams, optionally searched by title (?q=)."""
+    exams = Exam.objects.filter(teacher=request.user).only('id', 'title', 'teacher_id')
+    search = request.GET.get('q', '').strip()
+    if search:
+        exams = exams.filter(title__icontains=search)
+    return exams
+
+
+def teacher_exam_filter(request):
+    """The exam picked with ?exam=<id>, if it belongs to the teacher."""
+    exam_id = request.GET.get('exam', '')
+    if not exam_id.isdigit():
+        return None
+    return Exam.objects.filter(id=exam_id, teacher=request.user).only('id', 'title').first()
+
+
+def teacher_attempts(request):
+    """Completed attempts at the teacher's exams, filtered by ?exam=<id> and searched by student or exam (?q=)."""
+    attempts = StudentExamAttempt.objects.filter(
+        teacher=request.user, # Only attempts for exams created by the current teacher
+        score__isnull=False, # Only completed attempts
+        student__is_student=True # Explicitly filter for students
+    ).select_related('student', 'exam').only(
+        'id', 'score', 'student__id', 'student__username', 'exam__id', 'exam__title'
+    )
+    exam_id = request.GET.get('exam', '')
+    if exam_id.isdigit():
+        attempts = attempts.filter(exam_id=exam_id)
+    search = request.GET.get('q', '').strip()
+    if search:
+        attempts = attempts.filter(Q(student__username__icontains=search) | Q(exam__title__icontains=search))
+    return attempts
+
+
+@login_required(login_url='teacher_login')
+def teacher_dashboard_exams(request):
+    """Next page of the dashboard's exam list as an HTML fragment (?after=<cursor>)."""
+    if not request.user.is_teacher:
+        return JsonResponse({'error': 'Unauthorized'}, status=403)
+
+    exams, next_cursor = keyset_page(teacher_exams(request), request.GET.get('after'),
+                                     getattr(settings, 'DASHBOARD_PAGE_SIZE', 25))
+    return JsonResponse({
+        'html': render_to_string('users/teacher_dashboard_exam_rows.html', {'exams': exams}, request=request),
+        'next': next_cursor,
+    })
+
+
+@login_required(login_url='teacher_login')
+def teacher_dashboard_attempts(request):
+    """Next page of the dashboard's student attempts as an HTML fragment (?after=<cursor>)."""
+    if not request.user.is_teacher:
+        return JsonResponse({'error': 'Unauthorized'}, status=403)
+
+    attempts, next_cursor = keyset_page(teacher_attempts(request), request.GET.get('after'),
+                                        getattr(settings, 'DASHBOARD_PAGE_SIZE', 25))
+    return JsonResponse({
+        'html': render_to_string('users/teacher_dashboard_attempt_rows.html', {'student_attempts': attempts}, request=request),
+        'next': next_cursor,
+    })
+
+
+@login_required(login_url='teacher_login')
+def generation_job_status(request, job_id):
+    """Polling endpoint for the progress of a background generation job."""
+    if not request.user.is_teacher:
+        return JsonResponse({'error': 'Unauthorized'}, status=403)
+
+    job = get_object_or_404(GenerationJob, id=job_id, teacher=request.user)
+    return JsonResponse({
+        'job_id': job.id,
+        'exam_id': job.exam_id,
+        'status': job.status,
+        'finished': job.is_finished,
+        'questions_created': job.questions_created,
+        'shortfalls': job.shortfalls,
+        'error': job.error,
+        'created_at': job.created_at.isoformat(),
+        'started_at': job.started_at.isoformat() if job.started_at else None,
+        'finished_at': job.finished_at.isoformat() if job.finished_at else None,
     })
 
 
@@ -454,6 +321,7 @@ def delete_exam(request, exam_id):
     StudentResponse.objects.filter(exam=exam).update(exam=None)
 
     # Delete the exam AFTER updating student responses
+    invalidate_paper(exam.id)
     exam.delete()
 
     messages.success(request, "Exam deleted successfully! Student responses are retained.")
@@ -518,32 +386,21 @@ def create_exam(request):
             pdf_file_uploaded = request.FILES.get('pdf_document')
 
             if pdf_file_uploaded:
-                text = extract_text_from_pdf(pdf_file_uploaded)
-                identified_skills = extract_skills_from_text(text)
+                text = get_pdf_text(pdf_file_uploaded, request.user)
+                identified_skills = extract_skills_from_text(text) or []
                 exam.skills = identified_skills
                 exam.save()
 
-                for skill in identified_skills:
-                    for level in ["Easy", "Medium", "Hard"]:
-                        generated_questions = generate_questions_with_gpt(
-                            text=text, num_questions=num_questions_per_level, num_options=num_options, topic_prompt=f"{skill} - {level}"
-                        )
-
-                        for q_data in generated_questions:
-                            if q_data.get('text'):
-                                question = Question.objects.create(
-                                    exam=exam,
-                                    text=q_data['text'],
-                                    difficulty=level  # Ensure the question difficulty is saved
-                                )
-                                for choice in q_data.get('answer_choices', []):
-                                    AnswerChoice.objects.create(
-                                        question=question,
-                                        text=choice['text'],
-                                        is_correct=choice['is_correct']
-                                    )
-
-                messages.success(request, 'Exam created with questions from detected skills!')
+                controller = generate_exam_questions(
+                    exam, text, identified_skills,
+                    num_questions_per_level=num_questions_per_level, num_options=num_options,
+                    max_attempts=1
+                )
+
+                if controller.shortfalls():
+                    messages.warning(request, f"Exam created, but {sum(controller.shortfalls().values())} questions could not be generated.")
+                else:
+                    messages.success(request, 'Exam created with questions from detected skills!')
             else:
                 exam.save()
                 messages.success(request, 'Exam created successfully without auto-generated questions.')
@@ -573,12 +430,24 @@ def student_dashboard_view(request):
     if not request.user.is_student:
         return redirect('home')
 
-    available_exams = Exam.objects.all()
-    attempted_exams = Exam.objects.filter(responses__student=request.user).distinct()
+    after = request.GET.get('after', '')
+
+    def render_exam_list():
+        # One query: each exam is annotated with whether this student completed it
+        exams = Exam.objects.only('id', 'title', 'description').annotate(
+            attempted=Exists(StudentExamAttempt.objects.filter(
+                student=request.user, exam=OuterRef('pk'), score__isnull=False
+            ))
+        )
+        available_exams, next_cursor = keyset_page(exams, after, getattr(settings, 'DASHBOARD_PAGE_SIZE', 25))
+        return render_to_string('users/student_dashboard_exams.html', {
+            'available_exams': available_exams,
+            'next_cursor': next_cursor,
+            'after': after,
+        }, request=request)
 
     return render(request, 'users/student_dashboard.html', {
-        'available_exams': available_exams,
-        'attempted_exams': attempted_exams
+        'exam_list': get_fragment(request.user.id, after, render_exam_list),
     })
 
 
@@ -593,144 +462,94 @@ def take_exam(request, exam_id):
         messages.error(request, f"You have already completed this exam with a score of {existing_attempt.score:.2f}%.")
         return redirect('student_dashboard')
 
-    # Get and group questions by difficulty
-    questions = list(exam.questions.prefetch_related('answer_choices').all().order_by('difficulty', 'id'))
-    grouped_questions = {'easy': [], 'medium': [], 'hard': []}
-    for q in questions:
-        grouped_questions[q.difficulty.lower()].append(q)
-
-    # Session variables
-    responses = request.session.get('responses', [])
-    current_question_index = request.session.get('current_question_index', 0)
-    allowed_levels = request.session.get('allowed_levels', ['easy'])
+    # Questions grouped by difficulty, from the cached exam paper (no question queries)
+    paper = get_paper(exam)
+    reason = unavailable_reason(exam, paper)
+    if reason:
+        messages.error(request, reason)
+        return redirect('student_dashboard')
 
-    allowed_questions = [q for level in allowed_levels for q in grouped_questions[level]]
-    total_questions = len(allowed_questions)
+    # In-progress state lives in its own row (see ExamSession), not in request.session
+    state, _ = ExamSession.objects.get_or_create(student=request.user, exam=exam)
+    allowed_questions = questions_for(paper, state.allowed_levels)
+    section_mode = getattr(settings, 'EXAM_SECTION_MODE', False)
 
     # Handle form submission
     if request.method == 'POST':
-        question_id = request.POST.get('question_id')
-        selected_choice_id = request.POST.get('choice')
-
-        if not question_id or not selected_choice_id:
-            messages.error(request, "Please select an answer before continuing.")
-            return redirect('take_exam', exam_id=exam.id)
-
-        try:
-            question = get_object_or_404(Question, id=question_id)
-            selected_choice = get_object_or_404(AnswerChoice, id=selected_choice_id, question=question)
-        except:
-            messages.error(request, "Invalid question or choice.")
-            return redirect('take_exam', exam_id=exam.id)
-
-        # Save response in session
-        responses.append({
-            'question_id': question.id,
-            'choice_id': selected_choice.id,
-            'correct': selected_choice.is_correct,
-            'level': question.difficulty.lower()
-        })
-        request.session['responses'] = responses
-
-        # Advance to next question
-        current_question_index += 1
-        request.session['current_question_index'] = current_question_index
-
-        # If all current allowed questions are done
-        if current_question_index >= len(allowed_questions):
-            # Calculate performance
-            level_correct = {'easy': 0, 'medium': 0, 'hard': 0}
-            level_total = {'easy': 0, 'medium': 0, 'hard': 0}
-            for r in responses:
-                level = r['level']
-                level_total[level] += 1
-                if r['correct']:
-                    level_correct[level] += 1
-
-            # Update allowed levels
-            new_allowed_levels = ['easy']
-            if level_total['easy'] > 0 and (level_correct['easy'] / level_total['easy']) >= 0.5:
-                new_allowed_levels.append('medium')
-            if level_total['medium'] > 0 and (level_correct['medium'] / level_total['medium']) >= 0.5:
-                new_allowed_levels.append('hard')
-
-            # Check if new questions are unlocked
-            updated_questions = [q for level in new_allowed_levels for q in grouped_questions[level]]
-            if len(updated_questions) > len(allowed_questions):
-                # Update session with newly unlocked questions
-                request.session['allowed_levels'] = new_allowed_levels
-                request.session['current_question_index'] = len(allowed_questions)
+        if section_mode:
+            # A whole level at once: fields are named choice_<question id>
+            answers = {
+                int(key[len('choice_'):]): value
+                for key, value in request.POST.items()
+                if key.startswith('choice_') and key[len('choice_'):].isdigit()
+            }
+            try:
+                submit_section(state, paper, answers)
+            except ValueError as e:
+                messages.error(request, str(e))
                 return redirect('take_exam', exam_id=exam.id)
+        else:
+            question_id = request.POST.get('question_id')
+            selected_choice_id = request.POST.get('choice')
 
-            # Save responses to DB
-            StudentResponse.objects.filter(student=request.user, exam=exam).delete()
-            bulk_objects = []
-            for r in responses:
-                q = get_object_or_404(Question, id=r['question_id'])
-                choice = get_object_or_404(AnswerChoice, id=r['choice_id'])
-                bulk_objects.append(StudentResponse(student=request.user, exam=exam, question=q, selected_choice=choice))
-            StudentResponse.objects.bulk_create(bulk_objects)
-
-            # Final score
-            total_score = sum(level_correct.values())
-            total_possible = sum(level_total.values())
-            score_percent = (total_score / total_possible) * 100 if total_possible > 0 else 0
-
-            # Determine level
-            if 'medium' not in new_allowed_levels:
-                level_label = 'Needs Improvement'
-            elif 'hard' not in new_allowed_levels:
-                level_label = 'Average'
-            else:
-                level_label = 'Excellent'
-
-            # Save attempt
-            StudentExamAttempt.objects.update_or_create(
-                student=request.user,
-                exam=exam,
-                defaults={
-                    'score': score_percent,
-                    'end_time': timezone.now(),
-                    'easy_score': level_correct['easy'],
-                    'easy_total': level_total['easy'],
-                    'medium_score': level_correct['medium'],
-                    'medium_total': level_total['medium'],
-                    'hard_score': level_correct['hard'],
-                    'hard_total': level_total['hard'],
-                    'eligibility': level_label
-                }
-            )
+            if not question_id or not selected_choice_id:
+                messages.error(request, "Please select an answer before continuing.")
+                return redirect('take_exam', exam_id=exam.id)
 
-            # Clear session
-            request.session.pop('responses', None)
-            request.session.pop('current_question_index', None)
-            request.session.pop('allowed_levels', None)
+            try:
+                question = paper.questions[int(question_id)]
+                selected_choice_id = int(selected_choice_id)
+            except (KeyError, ValueError):
+                messages.error(request, "Invalid question or choice.")
+                return redirect('take_exam', exam_id=exam.id)
+            if selected_choice_id not in {choice.id for choice in question.choices}:
+                messages.error(request, "Invalid question or choice.")
+                return redirect('take_exam', exam_id=exam.id)
 
-            if 'medium' not in new_allowed_levels:
-                messages.warning(request, "You did not pass the easy section, so medium and hard sections were not attempted.")
-            elif 'hard' not in new_allowed_levels:
-                messages.warning(request, "You did not pass the medium section, so hard section was not attempted.")
-            else:
-                messages.success(request, f"Exam submitted successfully! Your score: {score_percent:.2f}%")
+            # Only the current question can be answered; a resubmitted page just shows the current one
+            if state.position >= len(allowed_questions) or allowed_questions[state.position].id != question.id:
+                return redirect('take_exam', exam_id=exam.id)
+            if not state.record_answer(selected_choice_id, *key_for_paper(paper).grade_answer(question.id, selected_choice_id)):
+                return redirect('take_exam', exam_id=exam.id)
 
-            return redirect('student_dashboard')
+        # Unlock the next level or, when nothing is left, save the scored attempt
+        attempt = advance(state, paper)
+        if attempt is None:
+            return redirect('take_exam', exam_id=exam.id)
 
-        return redirect('take_exam', exam_id=exam.id)
+        if attempt.eligibility == 'Needs Improvement':
+            messages.warning(request, "You did not pass the easy section, so medium and hard sections were not attempted.")
+        elif attempt.eligibility == 'Average':
+            messages.warning(request, "You did not pass the medium section, so hard section was not attempted.")
+        else:
+            messages.success(request, f"Exam submitted successfully! Your score: {attempt.score:.2f}%")
+        return redirect('student_dashboard')
 
-    # Render current question
-    if current_question_index < len(allowed_questions):
-        question = allowed_questions[current_question_index]
+    # Render the current section (section mode) or question
+    if section_mode:
+        section = current_section(state, paper)
+        if section:
+            return render(request, 'exams/take_exam_section.html', {
+                'exam': exam,
+                'questions': section,
+                'first_index': state.position + 1,
+                'last_index': state.position + len(section),
+                'total_questions': len(allowed_questions),
+                'level': section[0].difficulty
+            })
+    elif state.position < len(allowed_questions):
+        question = allowed_questions[state.position]
         return render(request, 'exams/take_exam.html', {
             'exam': exam,
             'question': question,
-            'answer_choices': question.answer_choices.all(),
-            'question_index': current_question_index + 1,
+            'answer_choices': question.choices,
+            'question_index': state.position + 1,
             'total_questions': len(allowed_questions),
             'level': question.difficulty
         })
 
     return redirect('student_dashboard')
-        
+
 
 
 @login_required(login_url='teacher_login')
@@ -744,6 +563,7 @@ def edit_question(request, question_id):
         if form.is_valid() and formset.is_valid():
             form.save()
             formset.save()
+            invalidate_paper(question.exam_id)
             messages.success(request, "Question updated successfully.")
             return redirect('view_exam', exam_id=question.exam.id)
     else:
@@ -826,7 +646,7 @@ def generate_skills_from_pdf(request):
     try:
         if pdf_file:
             #print(f"Received PDF file: {pdf_file.name}")
-            text = extract_text_from_pdf(pdf_file)
+            text = get_pdf_text(pdf_file, request.user)
             #print(f"Extracted text length: {len(text)}")
         else:
             text = topic_prompt
@@ -69,11 +69,86 @@ WSGI_APPLICATION = 'my_exam_website.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/5.0/ref/settings/#databases
 
-DATABASES = {       #This is where the database settings are defined.
-    'default': {
-        'ENGINE': 'django.db.backends.sqlite3', #Using SQLite as the database engine
-        'NAME': BASE_DIR / 'db.sqlite3',  #Path to the SQLite database file
+# SQLite tuned for concurrent use: WAL lets readers run alongside the writer, writers wait
+# (busy_timeout) instead of failing with "database is locked", and IMMEDIATE transactions
+# take the write lock up front so they can't deadlock upgrading from a read lock.
+SQLITE_OPTIONS = {
+    'init_command': (
+        'PRAGMA journal_mode=WAL;'
+        'PRAGMA synchronous=NORMAL;'  # durable in WAL mode except on power loss
+        'PRAGMA busy_timeout=20000;'  # milliseconds
+        'PRAGMA mmap_size=268435456;'  # 256 MB of memory-mapped reads
+        'PRAGMA cache_size=-64000;'  # 64 MB page cache
+        'PRAGMA temp_store=MEMORY;'
+    ),
+    'transaction_mode': 'IMMEDIATE',
+}
+
+# The database is chosen with environment variables: SQLite by default, or
+# DATABASE_ENGINE=postgresql with DB_NAME, DB_USER, DB_PASSWORD, DB_HOST and DB_PORT.
+DATABASE_ENGINE = os.environ.get('DATABASE_ENGINE', 'sqlite')
+
+if DATABASE_ENGINE == 'postgresql':
+    DATABASES = {       #This is where the database settings are defined.
+        'default': {
+            'ENGINE': 'django.db.backends.postgresql',
+            'NAME': os.environ.get('DB_NAME', 'exam_platform'),
+            'USER': os.environ.get('DB_USER', 'exam_platform'),
+            'PASSWORD': os.environ.get('DB_PASSWORD', ''),
+            'HOST': os.environ.get('DB_HOST', 'localhost'),
+            'PORT': os.environ.get('DB_PORT', '5432'),
+            'CONN_HEALTH_CHECKS': True,  # Re-check persistent connections before reusing them
+        }
+    }
+    if os.environ.get('DB_POOL', '').lower() in ('1', 'true', 'yes'):
+        # Connection pool inside each process (needs `pip install "psycopg[pool]"`); excludes CONN_MAX_AGE
+        DATABASES['default']['OPTIONS'] = {'pool': {
+            'min_size': int(os.environ.get('DB_POOL_MIN_SIZE', 2)),
+            'max_size': int(os.environ.get('DB_POOL_MAX_SIZE', 10)),
+        }}
+    else:
+        DATABASES['default']['CONN_MAX_AGE'] = int(os.environ.get('DB_CONN_MAX_AGE', 60))  # Persistent connections (seconds)
+else:
+    DATABASES = {       #This is where the database settings are defined.
+        'default': {
+            'ENGINE': 'django.db.backends.sqlite3', #Using SQLite as the database engine
+            'NAME': os.environ.get('SQLITE_PATH', BASE_DIR / 'db.sqlite3'),  #Path to the SQLite database file
+            'OPTIONS': SQLITE_OPTIONS,
+        }
+    }
+
+
+# Caches
+# 'default' holds exam papers and dashboard fragments, 'sessions' holds login sessions.
+# CACHE_BACKEND / SESSION_CACHE_BACKEND pick 'locmem' (per process), 'file' (shared by the
+# processes of one host) or 'redis' (shared by every host; any Redis-compatible server at
+# REDIS_URL, needs `pip install redis`).
+REDIS_URL = os.environ.get('REDIS_URL', 'redis://127.0.0.1:6379')
+
+
+def cache_config(backend, name):
+    if backend == 'redis':
+        return {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': REDIS_URL,
+            'KEY_PREFIX': name,
+        }
+    if backend == 'file':
+        return {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+            'LOCATION': BASE_DIR / 'cache' / name,
+            'OPTIONS': {'MAX_ENTRIES': 100000},
+        }
+    return {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': name,
     }
+
+
+CACHES = {
+    'default': cache_config(os.environ.get('CACHE_BACKEND', 'locmem'), 'default'),
+    # Sessions must be visible to every worker process, so they default to the file cache
+    'sessions': cache_config(os.environ.get('SESSION_CACHE_BACKEND', 'file'), 'sessions'),
 }
 
 
@@ -129,9 +204,58 @@ AUTH_USER_MODEL = 'users.User'
 SESSION_EXPIRE_AT_BROWSER_CLOSE = True
 SESSION_COOKIE_AGE = 86400  # 1 day (set a default session expiry)
 SESSION_COOKIE_SECURE = False  # Set to True if using HTTPS
-SESSION_ENGINE = "django.contrib.sessions.backends.db"  # Store session in DB
+# Sessions are read from the 'sessions' cache; SESSION_BACKEND picks 'cached_db' (writes go
+# through to the database, reads hit it only on a cache miss), 'cache' (no database at all;
+# sessions are lost if the cache is cleared) or 'db'.
+# Expired sessions are removed with `python manage.py clear_expired_sessions`.
+SESSION_ENGINE = "django.contrib.sessions.backends." + os.environ.get('SESSION_BACKEND', 'cached_db')
+SESSION_CACHE_ALIAS = 'sessions'
+EXAM_SESSION_MAX_AGE = 7 * 86400  # Seconds before an untouched in-progress exam (ExamSession) is discarded
 
 
 CSRF_TRUSTED_ORIGINS = [
     'https://skilleval.amplelms.com',
 ]
+
+# Exam question generation
+# Questions are generated by background workers: `python manage.py run_generation_workers`
+EXAM_GENERATION_WORKERS = 2  # Worker threads started by run_generation_workers
+EXAM_GENERATION_STALE_AFTER = 600  # Seconds without a heartbeat before a running job is re-queued
+EXAM_GENERATION_MAX_IN_FLIGHT = 6  # Skill/level prompts sent to the LLM at the same time
+EXAM_GENERATION_TIMEOUT = 120  # Seconds allowed for a single LLM call
+EXAM_GENERATION_RETRIES = 2  # Retries for a failed LLM call
+EXAM_GENERATION_BACKOFF = 2.0  # Base delay (seconds) of the exponential retry backoff
+EXAM_GENERATION_MAX_ATTEMPTS = 4  # LLM calls allowed per skill/level before the exam is left partial
+EXAM_GENERATION_TOKEN_BUDGET = 60000  # Estimated tokens allowed per skill/level bucket
+EXAM_GENERATION_BATCH_LEVELS = True  # Ask for a skill's Easy/Medium/Hard questions in one LLM call
+EXAM_DUPLICATE_THRESHOLD = 0.6  # Jaccard similarity of words and correct answer at which a generated question counts as a duplicate (exams/dedup.py)
+
+# Cache of LLM completions keyed by model, prompt version, input text and parameters (exams/llm_cache.py)
+LLM_CACHE = {
+    'BACKEND': 'disk',  # 'disk', 'django' or 'sqlite'
+    'LOCATION': BASE_DIR / 'llm_cache',  # Directory (disk), cache alias (django; 'default' when not a string) or db file (sqlite)
+    'TTL': 30 * 86400,  # Seconds before a cached completion expires
+    'MAX_ENTRIES': 5000,  # Least recently used completions are evicted above this
+    'BYPASS': False,  # Set to True to always call the model
+}
+
+# PDF text extraction (exams/pdf_text.py)
+PDF_EXTRACTION_WORKERS = min(os.cpu_count() or 1, 4)  # Processes used to extract large PDFs
+PDF_PARALLEL_MIN_PAGES = 64  # Smaller documents are extracted in-process (process start-up is not free)
+PDF_MAX_TEXT_CHARS = 2_000_000  # Text beyond this is dropped, bounding memory for huge documents
+FILE_UPLOAD_MAX_MEMORY_SIZE = 1024 * 1024  # Larger uploads are streamed to a temporary file on disk
+
+# Prompt context retrieval (exams/retrieval.py)
+RETRIEVAL_MIN_CHARS = 12000  # Texts up to this size are sent whole
+RETRIEVAL_CHUNK_CHARS = 1500  # Size of the chunks indexed for longer texts
+RETRIEVAL_TOP_K = 6  # Chunks sent with each skill's prompts
+
+# Precomputed exam papers served to take_exam (exams/paper.py)
+EXAM_PAPER_CACHE_SIZE = 128  # Papers kept in each process's local LRU
+EXAM_PAPER_CACHE_TIMEOUT = 3600  # Seconds a paper stays in the shared Django cache
+EXAM_SECTION_MODE = False  # Show and submit each difficulty level as one form instead of one question per request
+
+# Reports
+PERFORMANCE_ATTEMPTS_PER_PAGE = 20  # Attempts per page of a student's performance history
+DASHBOARD_PAGE_SIZE = 25  # Rows per page of the teacher and student dashboards
+STUDENT_DASHBOARD_CACHE_TIMEOUT = 300  # Seconds a student's rendered exam list is cached (see exams/dashboard_cache.py)
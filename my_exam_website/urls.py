@@ -6,5 +6,6 @@ urlpatterns = [
     path('admin/', admin.site.urls), # Admin panel
     path('users/', include('users.urls')),
     path('exams/', include('exams.urls')),
+    path('api/v1/', include('exams.api_urls')),  # JSON API for exam-taking clients (exams/api.py)
     path('', views.home, name='home'),  # Home page
 ]
\ No newline at end of file